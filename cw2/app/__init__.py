@@ -1,13 +1,27 @@
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from app.config import Config
+from app.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run PRAGMA statements on every new connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+    
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
 def create_app(config_class=Config):
     """Application factory function"""
     import os
@@ -27,6 +41,30 @@ def create_app(config_class=Config):
     login_manager.init_app(app)
     migrate.init_app(app, db)
     
+    # Tune SQLite connections (see SQLITE_PRAGMAS)
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, app.config.get('SQLITE_PRAGMAS'))
+    
+    from app.leaderboard import hot_posts_board
+    from app.suggest import suggestion_index
+    from app.search import search_cache
+    from app.pagination import count_cache
+    from app.utils import user_tags_cache
+    from app.view_counter import view_counter
+    from app.page_cache import page_cache
+    from app.assets import assets
+    from app.avatars import avatar_processor
+    hot_posts_board.init_app(app)
+    suggestion_index.init_app(app)
+    search_cache.init_app(app, 'SEARCH_CACHE_TTL')
+    count_cache.init_app(app, 'PAGINATION_COUNT_CACHE_TTL')
+    user_tags_cache.init_app(app, 'USER_TAGS_CACHE_TTL')
+    view_counter.init_app(app)
+    page_cache.init_app(app)
+    assets.init_app(app)
+    avatar_processor.init_app(app)
+    
     # Configure Flask-Login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Please login to access this page.'
@@ -35,7 +73,9 @@ def create_app(config_class=Config):
     @login_manager.user_loader
     def load_user(user_id):
         from app.models import User
-        return User.query.get(int(user_id))
+        # Always from the primary, so a replica lagging behind a new
+        # registration or profile change never logs the user out
+        return db.session.get(User, int(user_id), bind_arguments={'bind': db.engine})
     
     # Register blueprints
     from app.routes import main as main_blueprint
@@ -48,6 +88,10 @@ def create_app(config_class=Config):
     app.register_blueprint(api_blueprint, url_prefix='/api')
     app.register_blueprint(admin_blueprint, url_prefix='/admin')
     
+    # Register CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+    
     # Register error handlers
     @app.errorhandler(404)
     def page_not_found(e):
@@ -0,0 +1,178 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import re
+from pathlib import Path
+
+from flask import current_app, request, send_from_directory, url_for
+
+# Bundle name -> source files concatenated into it, in page order
+BUNDLES = {
+    'css/site.css': ['css/main.css', 'css/components.css', 'css/responsive.css',
+                     'css/icons.css', 'css/background.css'],
+    'js/site.js': ['js/main.js', 'js/ajax.js', 'js/search.js'],
+}
+
+# Single files fingerprinted on their own
+FILES = ['js/markdown-editor.js', 'images/background.jpg', 'images/default_avatar.png']
+
+# Fingerprinted output under the static folder
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Only text assets are worth precompressing
+COMPRESSIBLE = {'.css', '.js', '.svg'}
+
+# One year, the longest lifetime browsers honour
+IMMUTABLE_MAX_AGE = 31536000
+
+
+def minify_css(text):
+    """Strip comments and insignificant whitespace from a stylesheet"""
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    # Spaces before ':' are left alone, "a :hover" differs from "a:hover"
+    text = re.sub(r'\s*([{};,>])\s*', r'\1', text)
+    text = re.sub(r':\s+', ':', text)
+    return text.replace(';}', '}').strip()
+
+
+# Scripts are only bundled: line-based stripping would alter template
+# literals, and gzip already recovers most of the whitespace
+MINIFIERS = {'.css': minify_css}
+
+
+def _dist_folder(app):
+    return Path(app.static_folder) / DIST_DIR
+
+
+def _fingerprint(name, data):
+    """css/site.css + bytes -> dist/css/site.<hash>.css"""
+    path = Path(name)
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return f'{DIST_DIR}/{path.parent.as_posix()}/{path.stem}.{digest}{path.suffix}'
+
+
+class BuiltAssets:
+    """Fingerprinted files of one app, as listed in its manifest"""
+
+    def __init__(self):
+        self.paths = {}     # logical name -> fingerprinted path
+        self.built = set()  # fingerprinted paths
+
+
+class AssetManifest:
+    """
+    Maps logical static file names to their fingerprinted build output
+
+    build() minifies (CSS only) and concatenates BUNDLES, copies FILES, names every
+    output after a hash of its content and writes a .gz next to text
+    files. Once a manifest is loaded, url_for('static', ...) resolves
+    fingerprinted files to their hashed names, and those are served with
+    a far-future immutable Cache-Control, gzipped when accepted. Without
+    a build the original files are served as before.
+
+    Each app keeps its loaded manifest in app.extensions['assets'].
+    """
+
+    def init_app(self, app):
+        """Load the manifest and hook URL building and static serving"""
+        app.extensions['assets'] = BuiltAssets()
+        if app.config.get('USE_BUILT_ASSETS', False):
+            self.load(app)
+        app.url_defaults(self._static_defaults)
+        app.view_functions['static'] = self.send_static_file
+        app.context_processor(lambda: {'asset_urls': self.urls})
+
+    @staticmethod
+    def _state():
+        return current_app.extensions['assets']
+
+    @property
+    def dist_folder(self):
+        return _dist_folder(current_app)
+
+    def load(self, app=None):
+        """Read the manifest written by the app's last build, if any"""
+        app = app or current_app
+        try:
+            paths = json.loads((_dist_folder(app) / MANIFEST_NAME).read_text())
+        except (OSError, ValueError):
+            paths = {}
+        state = app.extensions['assets']
+        state.paths = paths
+        state.built = set(paths.values())
+
+    def _static_defaults(self, endpoint, values):
+        paths = self._state().paths
+        if endpoint == 'static' and values.get('filename') in paths:
+            values['filename'] = paths[values['filename']]
+
+    def urls(self, bundle):
+        """URLs to include for a bundle: the built file, or its sources"""
+        if bundle in self._state().paths:
+            return [url_for('static', filename=bundle)]
+        return [url_for('static', filename=name) for name in BUNDLES[bundle]]
+
+    def send_static_file(self, filename):
+        """Static view serving built files immutably and precompressed"""
+        if filename not in self._state().built:
+            return current_app.send_static_file(filename)
+
+        static_folder = current_app.static_folder
+        gz_path = Path(static_folder) / (filename + '.gz')
+        if 'gzip' in request.accept_encodings and gz_path.is_file():
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(static_folder, filename + '.gz', mimetype=mimetype,
+                                           max_age=IMMUTABLE_MAX_AGE)
+            response.content_encoding = 'gzip'
+        else:
+            response = send_from_directory(static_folder, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.vary.add('Accept-Encoding')
+        # max_age makes werkzeug send "public, max-age" instead of "no-cache"
+        response.cache_control.immutable = True
+        return response
+
+    def build(self):
+        """Write the current app's fingerprinted, minified and compressed assets plus the manifest"""
+        static_folder = Path(current_app.static_folder)
+        paths = {}
+
+        def write(name, data):
+            path = _fingerprint(name, data)
+            target = static_folder / path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(data)
+            if target.suffix in COMPRESSIBLE:
+                Path(f'{target}.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            paths[name] = path
+
+        # Single files first, so bundles can point at their hashed URLs
+        for name in FILES:
+            data = (static_folder / name).read_bytes()
+            minify = MINIFIERS.get(Path(name).suffix)
+            if minify is not None:
+                data = minify(data.decode('utf-8')).encode('utf-8')
+            write(name, data)
+
+        def rewrite_url(match):
+            name = match.group(2)
+            if name not in paths:
+                return match.group(0)
+            return f'url({match.group(1)}/static/{paths[name]}{match.group(1)})'
+
+        for bundle, sources in BUNDLES.items():
+            minify = MINIFIERS.get(Path(bundle).suffix, str)
+            text = '\n'.join(minify((static_folder / name).read_text('utf-8')) for name in sources)
+            text = re.sub(r'''url\((['"]?)/static/([^'")]+)\1\)''', rewrite_url, text)
+            write(bundle, text.encode('utf-8'))
+
+        manifest = self.dist_folder / MANIFEST_NAME
+        manifest.parent.mkdir(parents=True, exist_ok=True)
+        manifest.write_text(json.dumps(paths, indent=2, sort_keys=True))
+        self.load()
+        return paths
+
+
+assets = AssetManifest()
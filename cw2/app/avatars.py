@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from flask import current_app
+from PIL import Image, ImageOps
+
+# Thumbnails live under UPLOAD_FOLDER/avatars as <content hash>_<size>.<ext>
+AVATAR_DIR = 'avatars'
+DEFAULT_AVATAR = 'default_avatar.png'
+
+# Formats accepted regardless of the uploaded file's name
+ALLOWED_FORMATS = ('PNG', 'JPEG', 'GIF')
+MAX_AVATAR_PIXELS = 6000 * 6000
+
+
+def detect_image_format(data):
+    """Return the real format of an uploaded image, or None if it is not an allowed image"""
+    try:
+        with Image.open(BytesIO(data), formats=ALLOWED_FORMATS) as image:
+            image_format = image.format
+            if image.width * image.height > MAX_AVATAR_PIXELS:
+                return None
+            image.verify()
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        return None
+    return image_format
+
+
+def render_thumbnails(data, folder, sizes):
+    """
+    Write square thumbnails of an image at each size
+
+    Images with transparency are stored as PNG, everything else as JPEG.
+    Returns the avatar_url value naming the set, e.g. 'avatars/<hash>.jpg'.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    folder = Path(folder) / AVATAR_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(BytesIO(data), formats=ALLOWED_FORMATS) as image:
+        image = ImageOps.exif_transpose(image)  # First frame only for GIFs
+        has_alpha = (image.mode in ('RGBA', 'LA', 'PA') or
+                     (image.mode == 'P' and 'transparency' in image.info))
+        if has_alpha:
+            image = image.convert('RGBA')
+            ext, save_options = 'png', {'format': 'PNG', 'optimize': True}
+        else:
+            image = image.convert('RGB')
+            ext, save_options = 'jpg', {'format': 'JPEG', 'quality': 85, 'optimize': True,
+                                        'progressive': True}
+
+        for size in sizes:
+            target = folder / f'{digest}_{size}.{ext}'
+            if target.exists():
+                continue  # Same picture uploaded before
+            thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            partial = target.with_name(f'{target.name}.{threading.get_ident()}.tmp')
+            thumbnail.save(partial, **save_options)
+            os.replace(partial, target)
+
+    return f'{AVATAR_DIR}/{digest}.{ext}'
+
+
+class AvatarSettings:
+    """Avatar settings of one app"""
+
+    def __init__(self, app):
+        self.sizes = tuple(sorted(app.config.get('AVATAR_SIZES', (48, 128, 256))))
+        self.workers = app.config.get('AVATAR_WORKERS', 2)
+
+
+class AvatarProcessor:
+    """
+    Turns uploaded avatars into fixed-size thumbnails off the request
+
+    submit() hands the validated upload to a small thread pool. The worker
+    renders AVATAR_SIZES thumbnails under content-hashed names, then
+    points the user at them and removes their previous avatar files. The
+    old avatar keeps showing until the new one is ready. With
+    AVATAR_WORKERS = 0 uploads are processed inside the request instead.
+
+    Each app keeps its settings in app.extensions['avatar_processor'] and
+    uploads are processed in the app that received them. Apps share one
+    thread pool per process, sized by the first app that needs it.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Read avatar settings from app config"""
+        app.extensions['avatar_processor'] = AvatarSettings(app)
+
+    @staticmethod
+    def _settings():
+        return current_app.extensions['avatar_processor']
+
+    @property
+    def folder(self):
+        return Path(current_app.config['UPLOAD_FOLDER'])
+
+    def pick_size(self, size):
+        """Smallest stored thumbnail at least size pixels wide, or the largest"""
+        sizes = self._settings().sizes
+        for stored in sizes:
+            if stored >= size:
+                return stored
+        return sizes[-1]
+
+    def submit(self, user_id, data):
+        """Queue an upload for processing; returns a Future, or None if done inline"""
+        app = current_app._get_current_object()
+        workers = self._settings().workers
+        if not workers:
+            self._process_in(app, user_id, data)
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=workers,
+                                                    thread_name_prefix='avatar')
+        return self._executor.submit(self._process_in, app, user_id, data)
+
+    def _process_in(self, app, user_id, data):
+        with app.app_context():
+            return self.process(user_id, data)
+
+    def process(self, user_id, data):
+        """Render thumbnails for an upload and switch the user over to them"""
+        from app import db
+        from app.models import User
+
+        try:
+            avatar_url = render_thumbnails(data, self.folder, self._settings().sizes)
+            user = db.session.get(User, user_id)
+            if user is None:
+                return None
+            old_avatar_url, user.avatar_url = user.avatar_url, avatar_url
+            db.session.commit()
+            if old_avatar_url != avatar_url:
+                self.remove_unused(old_avatar_url)
+            return avatar_url
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Failed to process avatar for user %s', user_id)
+            return None
+
+    def remove_unused(self, avatar_url):
+        """Delete an avatar's files unless another user still shows the same picture"""
+        from app.models import User
+
+        if not avatar_url or avatar_url == DEFAULT_AVATAR:
+            return
+        if User.query.filter_by(avatar_url=avatar_url).first() is not None:
+            return
+
+        if avatar_url.startswith(AVATAR_DIR + '/'):
+            stem, ext = avatar_url.rsplit('.', 1)
+            paths = [self.folder / f'{stem}_{size}.{ext}' for size in self._settings().sizes]
+        else:
+            paths = [self.folder / avatar_url]  # Original upload from before thumbnails
+        for path in paths:
+            try:
+                path.unlink()
+            except OSError:
+                pass  # Already gone
+
+
+avatar_processor = AvatarProcessor()
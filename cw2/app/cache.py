@@ -0,0 +1,131 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+# Sentinel distinguishing "not cached" from a cached None
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Small thread-safe in-process cache with per-entry expiry
+
+    Each worker process keeps its own copy, so entries must be safe to
+    serve slightly stale until they expire or are invalidated locally.
+    When full, the oldest entry is evicted first.
+    """
+
+    def __init__(self, ttl=300, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (expires_at, value)
+
+    def init_app(self, app, ttl_key):
+        """Read the entry lifetime from app config"""
+        self.ttl = app.config.get(ttl_key, self.ttl)
+
+    def get(self, key, default=MISSING):
+        """Return the cached value, or default if missing or expired"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value, evicting the oldest entry when full"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (expires_at, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+
+def get_generation_state(name):
+    """
+    Current shared version of a family of cached data and when it was bumped
+
+    Returns (0, None) until first bumped. Read through the request's
+    session, so in replica-routed views it comes from the same replica as
+    the data and a lagging replica never stores old rows under a new
+    generation.
+    """
+    from app import db
+    from app.models import CacheGeneration
+
+    generations = CacheGeneration.__table__
+    row = db.session.execute(
+        select(generations.c.value, generations.c.changed_at).where(generations.c.name == name)
+    ).first()
+    return (row.value, row.changed_at) if row is not None else (0, None)
+
+
+def get_generation(name):
+    """Current shared version of a family of cached data (0 until first bumped)"""
+    return get_generation_state(name)[0]
+
+
+def bump_generations(*names):
+    """Mark families of cached data as changed, for every worker; returns {name: new value}"""
+    from app import db
+    from app.models import CacheGeneration
+    from app.utils import _insert_ignoring_duplicates
+
+    generations = CacheGeneration.__table__
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        for name in names:
+            conn.execute(_insert_ignoring_duplicates(generations).values(name=name, value=0))
+            conn.execute(update(generations).where(generations.c.name == name).values(
+                value=generations.c.value + 1, changed_at=now
+            ))
+        # Still inside the transaction that holds the rows, so these are our bumps
+        return dict(conn.execute(
+            select(generations.c.name, generations.c.value).where(generations.c.name.in_(names))
+        ).all())
+
+
+class GenerationCounter:
+    """
+    Version number for a family of cached data, shared by every worker
+
+    Cache keys include the current value, so a single bump() retires every
+    entry built before it without having to find and delete them. The
+    value lives in the cache_generations table, so a write handled by one
+    worker process retires the entries cached by all of them. Call bump()
+    after committing, since it writes on its own connection.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def value(self):
+        return get_generation(self.name)
+
+    def bump(self):
+        """Mark the underlying data as changed, returning the new value"""
+        return bump_generations(self.name)[self.name]
+
+
+# Bumped whenever posts are created, edited or deleted
+posts_generation = GenerationCounter('posts')
@@ -0,0 +1,119 @@
+import os
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+posts_cli = AppGroup('posts', help='Post maintenance commands')
+recommend_cli = AppGroup('recommend', help='Recommendation batch commands')
+users_cli = AppGroup('users', help='User maintenance commands')
+timeline_cli = AppGroup('timeline', help='Following feed commands')
+assets_cli = AppGroup('assets', help='Static asset build commands')
+replica_cli = AppGroup('replica', help='Read replica commands')
+
+
+@posts_cli.command('refresh-hot')
+@click.option('--all', 'all_posts', is_flag=True,
+              help='Recalculate every post, not only those still decaying')
+def refresh_hot(all_posts):
+    """Recalculate stored hot scores (run periodically, e.g. from cron)"""
+    from app.utils import refresh_hot_scores
+    count = refresh_hot_scores(all_posts=all_posts)
+    click.echo(f'Updated hot score for {count} posts')
+
+
+@posts_cli.command('render')
+@click.option('--all', 'all_posts', is_flag=True,
+              help='Re-render every post, not only missing or outdated ones')
+def render(all_posts):
+    """Store rendered Markdown HTML and plain-text previews for posts"""
+    from app import db
+    from app.models import Post
+    from app.utils import get_markdown_version, render_post_content
+    
+    query = Post.query
+    if not all_posts:
+        query = query.filter(db.or_(
+            Post.content_html_version.is_(None),
+            Post.content_html_version != get_markdown_version(),
+            Post.preview.is_(None)
+        ))
+    
+    post_ids = [post_id for (post_id,) in query.with_entities(Post.id).order_by(Post.id)]
+    for start in range(0, len(post_ids), 100):
+        for post in Post.query.filter(Post.id.in_(post_ids[start:start + 100])):
+            render_post_content(post)
+        db.session.commit()
+    click.echo(f'Rendered {len(post_ids)} posts')
+
+
+@posts_cli.command('reindex')
+def reindex():
+    """Create (if needed) and rebuild the SQLite full-text search index"""
+    from app.search import rebuild_fts_index
+    try:
+        rebuild_fts_index()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    click.echo('Search index rebuilt')
+
+
+@recommend_cli.command('build')
+@click.option('--limit', type=int, default=None,
+              help='Recommendations stored per user (default: RECOMMENDATIONS_PER_USER)')
+@click.option('--workers', type=int, default=os.cpu_count() or 1, show_default=True,
+              help='Worker processes used to score users')
+def recommend_build(limit, workers):
+    """Precompute recommendations for all active users"""
+    from app.utils import build_user_recommendations
+    limit = limit or current_app.config['RECOMMENDATIONS_PER_USER']
+    count = build_user_recommendations(limit=limit, workers=workers)
+    click.echo(f'Built recommendations for {count} users')
+
+
+@users_cli.command('reconcile-counts')
+def reconcile_counts():
+    """Recompute denormalized post/comment/follow counters for all users"""
+    from app.utils import reconcile_user_counts
+    count = reconcile_user_counts()
+    click.echo(f'Fixed counters for {count} users')
+
+
+@timeline_cli.command('rebuild')
+def timeline_rebuild():
+    """Rebuild every user's following timeline from the follow graph"""
+    from app.timeline import rebuild_timelines
+    count = rebuild_timelines()
+    click.echo(f'Wrote {count} timeline entries')
+
+
+@assets_cli.command('build')
+def assets_build():
+    """Minify, bundle, fingerprint and precompress static assets"""
+    from app.assets import assets
+    paths = assets.build()
+    for name, path in sorted(paths.items()):
+        click.echo(f'{name} -> {path}')
+
+
+@replica_cli.command('sync')
+def replica_sync():
+    """Copy the primary SQLite database over the SQLite read replicas"""
+    from app.replicas import sync_sqlite_replicas
+    try:
+        paths = sync_sqlite_replicas()
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    if not paths:
+        click.echo('No SQLite replicas configured (set REPLICA_DATABASE_URLS)')
+    for path in paths:
+        click.echo(f'Synced {path}')
+
+
+def register_commands(app):
+    """Register CLI command groups on the app"""
+    app.cli.add_command(posts_cli)
+    app.cli.add_command(recommend_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(timeline_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(replica_cli)
@@ -10,6 +10,14 @@ class Config:
         'sqlite:///' + str(basedir / 'instance' / 'database.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Read replica configuration (comma-separated URLs, e.g. a synced SQLite copy)
+    REPLICA_DATABASE_URLS = [url for url in os.environ.get('REPLICA_DATABASE_URLS', '').split(',') if url]
+    SQLALCHEMY_BINDS = {f'replica{i}': url for i, url in enumerate(REPLICA_DATABASE_URLS)}
+    REPLICA_STICKY_SECONDS = 10  # Seconds a visitor reads from the primary after writing
+    
+    # SQLite connection configuration (PRAGMAs run on every new connection)
+    SQLITE_PRAGMAS = {}
+    
     # Pagination configuration
     POSTS_PER_PAGE = 20
     
@@ -18,8 +26,60 @@ class Config:
     UPLOAD_FOLDER = basedir / 'static' / 'images' / 'uploads'
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     MAX_AVATAR_SIZE = 2 * 1024 * 1024  # 2MB
+    AVATAR_SIZES = (48, 128, 256)  # Square thumbnail widths rendered per upload
+    AVATAR_WORKERS = 2  # Thumbnail threads; 0 renders inside the request
+    
+    # Hot score configuration
+    HOT_POSTS_CACHE_SIZE = 50  # Posts kept in the in-memory leaderboard
+    HOT_POSTS_CACHE_TTL = 5 * 60  # Seconds before the leaderboard is reloaded
+    
+    # View counter configuration
+    VIEW_COUNT_FLUSH_INTERVAL = 10  # Seconds between buffered view count writes
+    VIEW_COUNT_FLUSH_SIZE = 100  # Buffered views that trigger an immediate write
+    
+    # Recommendation configuration
+    RECOMMENDATIONS_PER_USER = 20  # Posts stored per user by `flask recommend build`
+    USER_TAGS_CACHE_TTL = 10 * 60  # Seconds a user's tag interest profile is cached
+    
+    # Search suggestion configuration
+    SUGGESTION_INDEX_TTL = 10 * 60  # Seconds before the suggestion index is reloaded
+    SEARCH_CACHE_TTL = 5 * 60  # Seconds a page of search result IDs is cached
+    
+    # Pagination configuration
+    PAGINATION_COUNT_CACHE_TTL = 60  # Seconds a list's total count is cached
+    PAGINATION_COUNT_MODE = 'exact'  # 'estimated' stops counting at PAGINATION_COUNT_LIMIT
+    PAGINATION_COUNT_LIMIT = 1000  # Rows counted in estimated mode
+    
+    # Page cache configuration (anonymous visitors only)
+    PAGE_CACHE_TTL = 30  # Seconds a rendered page is served; 0 disables the cache
+    PAGE_CACHE_SIZE = 512  # Rendered pages kept per worker
+    
+    # Static asset configuration
+    USE_BUILT_ASSETS = False  # Serve bundles from `flask assets build`; on in ProductionConfig
+    
+    # Following timeline configuration
+    TIMELINE_FANOUT_LIMIT = 1000  # Authors with more followers are merged in on read
+    TIMELINE_BACKFILL_SIZE = 50  # Recent posts added to a feed on follow
     
     # Markdown configuration
     MARKDOWN_EXTENSIONS = ['codehilite', 'fenced_code', 'tables', 'nl2br']
 
 
+class ProductionConfig(Config):
+    """Production configuration tuned for concurrent access to SQLite"""
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # Readers no longer block the writer or each other
+        'synchronous': 'NORMAL',  # Safe with WAL; fsync at checkpoints, not every commit
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),  # ms to wait for the write lock
+        'mmap_size': 256 * 1024 * 1024,  # Read pages through a 256MB memory map
+        'cache_size': -64 * 1024,  # 64MB page cache per connection (negative means KiB)
+        'temp_store': 'MEMORY',  # Sorts and temp indexes stay off disk
+    }
+    USE_BUILT_ASSETS = True  # Serve bundles from `flask assets build` when present
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),  # Connections kept open per process
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),  # Extra connections under load
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),  # Seconds to wait for a free connection
+    }
+
+
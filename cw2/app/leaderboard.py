@@ -0,0 +1,133 @@
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from app.cache import GenerationCounter
+
+# Lightweight snapshot of a post held by the leaderboard
+HotPost = namedtuple('HotPost', ['id', 'title', 'hot_score'])
+
+
+class HotPostLeaderboard:
+    """
+    Process-wide top-K list of published posts ordered by hot score
+
+    Write paths push changes in with update() and remove(), so reads are
+    served from memory. Each change also bumps a shared generation, so the
+    other worker processes reload their boards on their next read. The
+    board is also reloaded from the indexed hot_score column once its TTL
+    expires, which corrects any drift from posts that fell out of the top K
+    and later climbed back.
+    """
+
+    def __init__(self, capacity=50, ttl=300):
+        self.capacity = capacity
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}  # post id -> HotPost
+        self._order = []    # sorted (-hot_score, -post id) keys, hottest first
+        self._loaded_at = None
+        self.generation = GenerationCounter('hot_posts')
+        self._generation = None  # Shared generation the board reflects
+
+    def init_app(self, app):
+        """Read leaderboard settings from app config"""
+        self.capacity = app.config.get('HOT_POSTS_CACHE_SIZE', self.capacity)
+        self.ttl = app.config.get('HOT_POSTS_CACHE_TTL', self.ttl)
+
+    @staticmethod
+    def _key(entry):
+        return (-entry.hot_score, -entry.id)
+
+    def is_stale(self):
+        """Check whether the board needs reloading from the database"""
+        return (self._loaded_at is None or
+                datetime.utcnow() - self._loaded_at > timedelta(seconds=self.ttl) or
+                self.generation.value != self._generation)
+
+    def invalidate(self):
+        """Force a reload on the next read, in every worker (call after commit)"""
+        self.generation.bump()
+        with self._lock:
+            self._loaded_at = None
+
+    def _publish(self):
+        """Tell other workers about a change already applied to this board"""
+        value = self.generation.bump()
+        with self._lock:
+            if self._generation == value - 1:
+                self._generation = value  # No other worker's change in between
+            else:
+                self._loaded_at = None
+
+    @staticmethod
+    def _load(limit):
+        from app import db
+        from app.models import Post
+
+        rows = db.session.query(Post.id, Post.title, Post.hot_score).filter(
+            Post.is_draft == False
+        ).order_by(Post.hot_score.desc(), Post.id.desc()).limit(limit)
+        return [HotPost(row.id, row.title, row.hot_score) for row in rows]
+
+    def rebuild(self):
+        """Reload the top posts from the database"""
+        # Read first, so a change landing during the load triggers another one
+        generation = self.generation.value
+        entries = {entry.id: entry for entry in self._load(self.capacity)}
+        with self._lock:
+            self._entries = entries
+            self._order = sorted(self._key(entry) for entry in entries.values())
+            self._loaded_at = datetime.utcnow()
+            self._generation = generation
+
+    def top(self, limit):
+        """Return up to limit hottest posts as HotPost snapshots, hottest first"""
+        if limit > self.capacity:
+            # Larger than the board can answer, go to the index directly
+            return self._load(limit)
+
+        if self.is_stale():
+            self.rebuild()
+        with self._lock:
+            return [self._entries[-post_id] for _, post_id in self._order[:limit]]
+
+    def _discard(self, post_id):
+        entry = self._entries.pop(post_id, None)
+        if entry is not None:
+            index = bisect_left(self._order, self._key(entry))
+            del self._order[index]
+
+    def _apply(self, post):
+        if self._loaded_at is None:
+            return  # Not loaded yet, next read rebuilds from the database
+        self._discard(post.id)
+        if post.is_draft:
+            return
+
+        entry = HotPost(post.id, post.title, post.hot_score or 0)
+        key = self._key(entry)
+        if len(self._order) >= self.capacity and key > self._order[-1]:
+            return  # Not hot enough to enter the board
+
+        self._entries[entry.id] = entry
+        insort(self._order, key)
+        if len(self._order) > self.capacity:
+            _, evicted_id = self._order.pop()
+            del self._entries[-evicted_id]
+
+    def update(self, post):
+        """Apply a changed hot score, title or draft flag for a post (call after commit)"""
+        with self._lock:
+            self._apply(post)
+        self._publish()
+
+    def remove(self, post_id):
+        """Drop a deleted post from the board (call after commit)"""
+        with self._lock:
+            self._discard(post_id)
+        self._publish()
+
+
+hot_posts_board = HotPostLeaderboard()
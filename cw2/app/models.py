@@ -1,9 +1,34 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import Float, case, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.expression import FunctionElement
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
 
+class hours_since(FunctionElement):
+    """SQL expression for the hours elapsed since a UTC timestamp column"""
+    type = Float()
+    inherit_cache = True
+
+
+@compiles(hours_since, 'sqlite')
+def _hours_since_sqlite(element, compiler, **kw):
+    return "((julianday('now') - julianday(%s)) * 24)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(hours_since, 'postgresql')
+def _hours_since_postgresql(element, compiler, **kw):
+    return "(EXTRACT(EPOCH FROM (now() AT TIME ZONE 'utc' - %s)) / 3600)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(hours_since)
+def _hours_since_default(element, compiler, **kw):
+    return '(TIMESTAMPDIFF(SECOND, %s, UTC_TIMESTAMP()) / 3600.0)' % compiler.process(element.clauses, **kw)  # MySQL / MariaDB
+
+
 # Many-to-many relationship intermediate tables
 post_tags = db.Table('post_tags',
     db.Column('post_id', db.Integer, db.ForeignKey('posts.id'), primary_key=True),
@@ -54,6 +79,11 @@ class User(UserMixin, db.Model):
     last_login = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_admin = db.Column(db.Boolean, default=False, nullable=False)
+    # Denormalized stats, kept current by the write paths via adjust_counts()
+    posts_count = db.Column(db.Integer, default=0, nullable=False)  # Published posts
+    comments_count = db.Column(db.Integer, default=0, nullable=False)  # Non-deleted comments
+    following_count = db.Column(db.Integer, default=0, nullable=False)
+    followers_count = db.Column(db.Integer, default=0, nullable=False)
     
     # 关系
     posts = db.relationship('Post', backref='author', lazy='dynamic', 
@@ -94,14 +124,17 @@ class User(UserMixin, db.Model):
     
     def is_following(self, user):
         """Check if following a user"""
-        return self.following.filter(
+        return db.session.query(db.exists().where(
+            follows.c.follower_id == self.id,
             follows.c.following_id == user.id
-        ).count() > 0
+        )).scalar()
     
     def follow(self, user):
         """Follow user"""
         if not self.is_following(user) and user != self:
             self.following.append(user)
+            self.adjust_counts(following_count=1)
+            user.adjust_counts(followers_count=1)
             return True
         return False
     
@@ -109,9 +142,52 @@ class User(UserMixin, db.Model):
         """Unfollow user"""
         if self.is_following(user):
             self.following.remove(user)
+            self.adjust_counts(following_count=-1)
+            user.adjust_counts(followers_count=-1)
             return True
         return False
     
+    def adjust_counts(self, **deltas):
+        """Add deltas to the stats counters, e.g. adjust_counts(posts_count=1)"""
+        User.adjust_counts_for(self.id, **deltas)
+    
+    @staticmethod
+    def adjust_counts_for(user_id, **deltas):
+        """
+        Add deltas to a user's stats counters by ID
+        
+        Runs as UPDATE ... SET col = col + delta in the current transaction,
+        so concurrent requests cannot overwrite each other's changes.
+        """
+        values = {getattr(User, name): getattr(User, name) + delta
+                  for name, delta in deltas.items() if delta}
+        if values:
+            db.session.execute(update(User).where(User.id == user_id).values(values))
+    
+    def _has_row(self, table, column, target_id):
+        return db.session.query(db.exists().where(
+            table.c.user_id == self.id,
+            column == target_id
+        )).scalar()
+    
+    def has_liked_post(self, post):
+        """Check if the user liked a post"""
+        return self._has_row(post_likes, post_likes.c.post_id, post.id)
+    
+    def has_bookmarked(self, post):
+        """Check if the user bookmarked a post"""
+        return self._has_row(bookmarks, bookmarks.c.post_id, post.id)
+    
+    def liked_comment_ids(self, comment_ids):
+        """Subset of comment_ids the user liked, in one query"""
+        if not comment_ids:
+            return set()
+        rows = db.session.query(comment_likes.c.comment_id).filter(
+            comment_likes.c.user_id == self.id,
+            comment_likes.c.comment_id.in_(list(comment_ids))
+        )
+        return {comment_id for (comment_id,) in rows}
+    
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -122,7 +198,11 @@ class Post(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False, index=True)
-    content = db.Column(db.Text, nullable=False)
+    # Large text columns are deferred so list queries do not load them
+    content = db.deferred(db.Column(db.Text, nullable=False))
+    content_html = db.deferred(db.Column(db.Text, nullable=True))  # Rendered Markdown
+    content_html_version = db.Column(db.String(40), nullable=True)  # Renderer settings used
+    preview = db.Column(db.String(255), nullable=True)  # Plain-text excerpt for list pages
     author_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     category = db.Column(db.String(20), nullable=False, index=True, default='Other')
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -131,30 +211,65 @@ class Post(db.Model):
     view_count = db.Column(db.Integer, default=0, nullable=False)
     like_count = db.Column(db.Integer, default=0, nullable=False)
     comment_count = db.Column(db.Integer, default=0, nullable=False)
+    hot_score = db.Column(db.Float, default=0, nullable=False, index=True)
     is_pinned = db.Column(db.Boolean, default=False, nullable=False)
     is_draft = db.Column(db.Boolean, default=False, nullable=False)
     
     # 关系
     comments = db.relationship('Comment', backref='post', lazy='dynamic',
                               cascade='all, delete-orphan', order_by='Comment.created_at')
+    # Plain list so listings can batch-load tags with selectinload
     tags = db.relationship(
         'Tag', secondary=post_tags,
-        backref=db.backref('posts', lazy='dynamic'),
-        lazy='dynamic'
+        backref=db.backref('posts', lazy='dynamic')
     )
     
     def increment_view(self):
-        """Increment view count"""
-        self.view_count += 1
-        db.session.commit()
+        """Increment view count (buffered, see app.view_counter)"""
+        from app.view_counter import view_counter
+        pending = view_counter.add(self.id)
+        # Show buffered views without marking the row dirty
+        set_committed_value(self, 'view_count', self.view_count + pending)
+        set_committed_value(self, 'hot_score', self.calculate_hot_score())
+    
+    @staticmethod
+    def hot_score_for(like_count, comment_count, view_count, created_at):
+        """Hotness formula shared by instances and bulk recalculation"""
+        created_at = created_at or datetime.utcnow()
+        hours_old = (datetime.utcnow() - created_at).total_seconds() / 3600
+        time_factor = max(0, 1 - hours_old / 168)  # Time decay within a week
+        return ((like_count or 0) * 2 + 
+                (comment_count or 0) * 3 + 
+                (view_count or 0) * 0.1) * (1 + time_factor)
+    
+    @staticmethod
+    def hot_score_gain(likes=0, comments=0, views=0):
+        """
+        SQL expression for the hot score a post gains from new likes, comments or views
+
+        Same weights and time decay as hot_score_for, evaluated against the
+        row's created_at, so counter UPDATEs can move hot_score in the same
+        statement. Arguments may be numbers or bind parameters.
+        """
+        hours_old = hours_since(Post.created_at)
+        time_factor = case((hours_old < 168, 1 - hours_old / 168), else_=0)
+        return (likes * 2 + comments * 3 + views * 0.1) * (1 + time_factor)
     
     def calculate_hot_score(self):
         """Calculate hotness score"""
-        hours_old = (datetime.utcnow() - self.created_at).total_seconds() / 3600
-        time_factor = max(0, 1 - hours_old / 168)  # Time decay within a week
-        return (self.like_count * 2 + 
-                self.comment_count * 3 + 
-                self.view_count * 0.1) * (1 + time_factor)
+        return Post.hot_score_for(self.like_count, self.comment_count,
+                                  self.view_count, self.created_at)
+    
+    def update_hot_score(self):
+        """Store the current hotness score so hot sorting can be done in SQL"""
+        self.hot_score = self.calculate_hot_score()
+    
+    # Serve keyset pagination on the counter sort orders
+    __table_args__ = (
+        db.Index('ix_posts_like_count_id', 'like_count', 'id'),
+        db.Index('ix_posts_comment_count_id', 'comment_count', 'id'),
+        db.Index('ix_posts_view_count_id', 'view_count', 'id'),
+    )
     
     def __repr__(self):
         return f'<Post {self.title}>'
@@ -218,3 +333,56 @@ class Comment(db.Model):
         return f'<Comment {self.id}>'
 
 
+
+
+class UserRecommendation(db.Model):
+    """Precomputed recommendation (written by `flask recommend build`)"""
+    __tablename__ = 'user_recommendations'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), primary_key=True)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    user = db.relationship('User', backref=db.backref(
+        'recommendations', lazy='dynamic', cascade='all, delete-orphan'))
+    post = db.relationship('Post', backref=db.backref(
+        'recommendations', lazy='dynamic', cascade='all, delete-orphan'))
+    
+    __table_args__ = (
+        db.Index('ix_user_recommendations_user_rank', 'user_id', 'rank'),
+    )
+    
+    def __repr__(self):
+        return f'<UserRecommendation {self.user_id}:{self.post_id}>'
+
+
+class TimelineEntry(db.Model):
+    """Post in a follower's "Following" feed, written when the post is published"""
+    __tablename__ = 'timeline_entries'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='CASCADE'), primary_key=True)
+    author_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)  # Copied from the post
+    
+    # A feed page is one range scan of this index
+    __table_args__ = (
+        db.Index('ix_timeline_entries_user_created', 'user_id', 'created_at', 'post_id'),
+    )
+    
+    def __repr__(self):
+        return f'<TimelineEntry {self.user_id}:{self.post_id}>'
+
+
+class CacheGeneration(db.Model):
+    """Version number of a family of cached data, shared by every worker (see app.cache)"""
+    __tablename__ = 'cache_generations'
+    
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime)  # Time of the last bump, None until then
+    
+    def __repr__(self):
+        return f'<CacheGeneration {self.name}={self.value}>'
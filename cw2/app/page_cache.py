@@ -0,0 +1,142 @@
+import hashlib
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from werkzeug.http import is_resource_modified
+
+from app.cache import MISSING, TTLCache, bump_generations, get_generation_state
+
+# Rendered page as sent to anonymous visitors
+CachedPage = namedtuple('CachedPage', ['body', 'mimetype'])
+
+# ETag and Last-Modified of one version of a page, the same in every worker
+Validators = namedtuple('Validators', ['etag', 'last_modified'])
+
+# Invalidation group shared by every page that lists posts
+LISTS = 'lists'
+
+
+def post_group(post_id):
+    """Invalidation group of a single post's page"""
+    return f'post:{post_id}'
+
+
+class PageCache:
+    """
+    Process-wide cache of fully rendered public pages for anonymous GETs
+
+    Pages are keyed by path and query string plus the current version of
+    their invalidation group. Write paths call invalidate_post(), which
+    bumps the versions so older renders are never served again and age
+    out of the underlying TTLCache. Versions are shared generations (see
+    app.cache), so a write in one worker retires the pages every worker
+    has cached.
+
+    The ETag and Last-Modified date are derived from the version rather
+    than the body, so every worker answers a matching conditional request
+    with a 304 before looking for or rendering the page. Renders of one
+    version may differ in details such as view counts, hence weak ETags.
+    """
+
+    def __init__(self, ttl=30, maxsize=512):
+        self._pages = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    def init_app(self, app):
+        """Read cache settings from app config"""
+        self._pages.init_app(app, 'PAGE_CACHE_TTL')
+        self._pages.maxsize = app.config.get('PAGE_CACHE_SIZE', self._pages.maxsize)
+
+    def invalidate(self, *groups):
+        """Retire every cached page in the given groups"""
+        bump_generations(*(f'page:{group}' for group in groups))
+
+    def invalidate_post(self, post_id, lists=True):
+        """Retire a post's page and, unless lists is False, every post list"""
+        if lists:
+            self.invalidate(post_group(post_id), LISTS)
+        else:
+            self.invalidate(post_group(post_id))
+
+    def clear(self):
+        """Drop every cached page"""
+        self._pages.clear()
+
+    @staticmethod
+    def _cacheable():
+        # Logged-in pages and pages with pending flash messages are per visitor
+        return (request.method in ('GET', 'HEAD') and
+                not current_user.is_authenticated and
+                '_flashes' not in session)
+
+    def _version(self, name):
+        """
+        Cache key and validators of the requested page
+
+        A version is the group's generation within one TTL-long window of
+        wall-clock time, so pages showing data that changes without a bump
+        (view counts, "5 minutes ago") still move on once per TTL.
+        """
+        generation, changed_at = get_generation_state(f'page:{name}')
+        ttl = self._pages.ttl
+        window = int(time.time() // ttl)
+        key = (request.full_path, name, generation, window)
+
+        last_modified = datetime.fromtimestamp(window * ttl, timezone.utc)
+        if changed_at is not None:
+            last_modified = max(last_modified, changed_at.replace(microsecond=0, tzinfo=timezone.utc))
+        etag = hashlib.sha256(repr(key).encode()).hexdigest()
+        return key, Validators(etag, last_modified)
+
+    @staticmethod
+    def _respond(page, validators):
+        response = current_app.response_class(page.body, mimetype=page.mimetype)
+        response.set_etag(validators.etag, weak=True)
+        response.last_modified = validators.last_modified
+        # Let browsers keep the page but revalidate it on every visit
+        response.cache_control.no_cache = True
+        response.vary.add('Cookie')
+        return response.make_conditional(request)
+
+    def cached(self, group, on_hit=None):
+        """
+        Serve a view from the page cache to anonymous visitors
+
+        group is the invalidation group name, or a function of the view
+        arguments returning it. on_hit runs with the view arguments for
+        every request answered without calling the view, 304s included,
+        for side effects the view would otherwise perform.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(**kwargs):
+                if not self._pages.ttl or not self._cacheable():
+                    return view(**kwargs)
+
+                name = group(**kwargs) if callable(group) else group
+                key, validators = self._version(name)
+                if not is_resource_modified(request.environ, etag=validators.etag,
+                                            last_modified=validators.last_modified):
+                    # The visitor has this version, whichever worker rendered it
+                    page = CachedPage(b'', None)
+                else:
+                    page = self._pages.get(key)
+                if page is not MISSING:
+                    if on_hit is not None:
+                        on_hit(**kwargs)
+                    return self._respond(page, validators)
+
+                response = make_response(view(**kwargs))
+                if response.status_code != 200 or session.modified:
+                    return response
+                page = CachedPage(body=response.get_data(), mimetype=response.mimetype)
+                self._pages.set(key, page)
+                return self._respond(page, validators)
+            return wrapper
+        return decorator
+
+
+page_cache = PageCache()
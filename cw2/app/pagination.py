@@ -0,0 +1,252 @@
+import base64
+import json
+from datetime import datetime
+from math import ceil
+
+from flask import current_app
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import operators
+
+from app.cache import MISSING, TTLCache
+
+# (list name, filters...) -> (total, is estimate)
+count_cache = TTLCache(ttl=60, maxsize=1024)
+
+
+def iter_page_numbers(page, pages, left_edge=2, left_current=2, right_current=4, right_edge=2):
+    """Page numbers to link to around page out of pages, with None for skipped ranges"""
+    pages_end = pages + 1
+    if pages_end == 1:
+        return
+    left_end = min(1 + left_edge, pages_end)
+    yield from range(1, left_end)
+    if left_end == pages_end:
+        return
+    mid_start = max(left_end, page - left_current)
+    mid_end = min(page + right_current + 1, pages_end)
+    if mid_start - left_end > 0:
+        yield None
+    yield from range(mid_start, mid_end)
+    if mid_end == pages_end:
+        return
+    right_start = max(mid_end, pages_end - right_edge)
+    if right_start - mid_end > 0:
+        yield None
+    yield from range(right_start, pages_end)
+
+
+def encode_cursor(values, page, backwards=False):
+    """Pack boundary sort key values into an opaque URL-safe token"""
+    payload = {
+        'v': [{'dt': value.isoformat()} if isinstance(value, datetime) else value
+              for value in values],
+        'p': page,
+    }
+    if backwards:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor into (values, page, backwards), or None if malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+                  for value in payload['v']]
+        page = max(int(payload.get('p', 1)), 1)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    # Only scalars can be bound into the seek predicate; null, lists and
+    # booleans come from tampered tokens
+    if not all(isinstance(value, (str, int, float, datetime)) and not isinstance(value, bool)
+               for value in values):
+        return None
+    return values, page, bool(payload.get('b'))
+
+
+def _fits(column, value):
+    """Whether value can be compared with column without a bind error"""
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return True
+    if expected in (int, float):
+        return isinstance(value, (int, float))
+    return isinstance(value, expected)
+
+
+def _split_order(order):
+    """Turn [Post.like_count.desc(), Post.id.desc()] into [(column, descending)]"""
+    keys = []
+    for clause in order:
+        descending = getattr(clause, 'modifier', None) is operators.desc_op
+        column = clause.element if hasattr(clause, 'modifier') else clause
+        keys.append((column, descending))
+    return keys
+
+
+def _after(keys, values):
+    """WHERE clause for rows strictly after the boundary in the given order"""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        step = column < values[i] if descending else column > values[i]
+        ties = [keys[j][0] == values[j] for j in range(i)]
+        clauses.append(and_(*ties, step) if ties else step)
+    return or_(*clauses)
+
+
+class KeysetPagination:
+    """
+    One page of a query ordered on unique sort keys, fetched by seeking
+    past the boundary row of the previous page instead of using OFFSET
+
+    order must end with a unique column (the primary key) so every row
+    has a distinct position. Following next_cursor / prev_cursor costs the
+    same on page 500 as on page 1, and rows inserted meanwhile do not shift
+    the page. A plain page number (for jumping straight to a page) falls
+    back to OFFSET. Exposes the attributes templates already use with
+    Flask-SQLAlchemy's Pagination.
+
+    The total is only counted when a template asks for it. Pass total when
+    it is already known, or count_key (the list name plus its filters) to
+    share the count through count_cache. With PAGINATION_COUNT_MODE =
+    'estimated' counting stops at PAGINATION_COUNT_LIMIT rows and
+    total_is_estimate is set.
+    """
+
+    def __init__(self, query, order, cursor=None, page=1, per_page=20, count_key=None, total=None,
+                 boundary=None):
+        self.per_page = per_page
+        self._query = query
+        self._keys = _split_order(order)
+        self._boundary_values = boundary  # item -> sort key values, if not attributes of the item
+        self._count_key = count_key
+        self._total = total  # Known up front, e.g. from a stored counter
+        self._estimate = False
+
+        decoded = decode_cursor(cursor) if cursor else None
+        if decoded is not None:
+            values, _, backwards = decoded
+            # An empty boundary is only valid backwards, meaning "from the end"
+            if len(values) != len(self._keys) and (values or not backwards):
+                decoded = None
+            elif not all(_fits(column, value) for (column, _), value in zip(self._keys, values)):
+                decoded = None
+
+        if decoded is None:
+            # First page, or a direct jump to a page number
+            self.page = max(page or 1, 1)
+            rows = query.order_by(*order).offset((self.page - 1) * per_page).limit(per_page + 1).all()
+            self.has_prev = self.page > 1
+            self.has_next = len(rows) > per_page
+            self.items = rows[:per_page]
+        else:
+            values, self.page, backwards = decoded
+            if backwards:
+                # Walk the order in reverse from the boundary, then flip back
+                reverse = [column.asc() if descending else column.desc()
+                           for column, descending in self._keys]
+                reverse_keys = [(column, not descending) for column, descending in self._keys]
+                if values:
+                    query = query.filter(_after(reverse_keys, values))
+                    size = per_page
+                else:
+                    # No boundary means the last page, which only holds the
+                    # remainder so earlier pages line up with OFFSET paging
+                    self.page = max(ceil(self.total / per_page), 1)
+                    size = self.total - (self.page - 1) * per_page or per_page
+                rows = query.order_by(*reverse).limit(size + 1).all()
+                self.has_prev = len(rows) > size
+                self.has_next = bool(values)
+                self.items = rows[:size][::-1]
+                if not self.has_prev:
+                    self.page = 1
+            else:
+                rows = query.filter(_after(self._keys, values)).order_by(*order).limit(per_page + 1).all()
+                self.has_prev = True
+                self.has_next = len(rows) > per_page
+                self.items = rows[:per_page]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def _boundary(self, item):
+        if self._boundary_values is not None:
+            return self._boundary_values(item)
+        return [getattr(item, column.key) for column, _ in self._keys]
+
+    @property
+    def next_cursor(self):
+        """Cursor for the page after this one, or None"""
+        if not self.has_next or not self.items:
+            return None
+        return encode_cursor(self._boundary(self.items[-1]), self.page + 1)
+
+    @property
+    def prev_cursor(self):
+        """Cursor for the page before this one, or None"""
+        if not self.has_prev or not self.items:
+            return None
+        return encode_cursor(self._boundary(self.items[0]), self.page - 1, backwards=True)
+
+    @property
+    def last_cursor(self):
+        """Cursor for the last page, read backwards from the end"""
+        if not self.has_next or self.total_is_estimate:
+            return None
+        return encode_cursor([], 0, backwards=True)  # Page number is counted on use
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def _count(self):
+        query = self._query.order_by(None)
+        if current_app.config.get('PAGINATION_COUNT_MODE') == 'estimated':
+            limit = current_app.config.get('PAGINATION_COUNT_LIMIT', 1000)
+            total = query.limit(limit).count()
+            return total, total >= limit
+        return query.count(), False
+
+    def _load_total(self):
+        if self._total is not None:
+            return
+        cached = MISSING
+        if self._count_key is not None:
+            cached = count_cache.get(self._count_key)
+        if cached is MISSING:
+            cached = self._count()
+            if self._count_key is not None:
+                count_cache.set(self._count_key, cached)
+        self._total, self._estimate = cached
+
+    @property
+    def total(self):
+        """Total matching rows, counted (or read from count_cache) on first access"""
+        self._load_total()
+        return self._total
+
+    @property
+    def total_is_estimate(self):
+        """Whether total is a lower bound from an estimated count"""
+        self._load_total()
+        return self._estimate
+
+    @property
+    def pages(self):
+        # A cached or estimated total can lag behind; never hide a next page
+        pages = ceil(self.total / self.per_page) if self.total else 0
+        if self.has_next:
+            pages = max(pages, self.page + 1)
+        return max(pages, self.page if self.items else 0)
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """Page numbers to link to, with None for skipped ranges"""
+        return iter_page_numbers(self.page, self.pages, left_edge, left_current,
+                                 right_current, right_edge)
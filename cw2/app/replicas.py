@@ -0,0 +1,112 @@
+import random
+import sqlite3
+import time
+from functools import wraps
+
+from flask import current_app, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# SQLALCHEMY_BINDS keys starting with this name are read replicas
+REPLICA_BIND_PREFIX = 'replica'
+
+
+def replica_bind_keys(engines):
+    """Bind keys of the configured read replicas"""
+    return [key for key in engines
+            if isinstance(key, str) and key.startswith(REPLICA_BIND_PREFIX)]
+
+
+class RoutingSession(Session):
+    """
+    Session that sends SELECTs of replica-routed requests to a read replica
+
+    Views wrapped with use_replica mark the request's session. From then
+    on plain SELECTs go to one randomly chosen replica for the rest of the
+    request. Anything else stays on the primary: flushes, INSERT/UPDATE/
+    DELETE statements and textual SQL. After the first write every later
+    read in the request also goes to the primary, so a request always
+    reads its own writes, and for REPLICA_STICKY_SECONDS afterwards the
+    same visitor's requests stay on the primary too. Without replica binds
+    everything uses the primary as before.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if self._flushing or getattr(clause, 'is_dml', False):
+            self.info['wrote'] = True
+        elif (bind is None and getattr(clause, 'is_select', False) and
+              self.info.get('use_replica') and not self.info.get('wrote')):
+            engine = self._replica_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica_engine(self):
+        engines = self._db.engines
+        if 'replica_key' not in self.info:
+            keys = replica_bind_keys(engines)
+            self.info['replica_key'] = random.choice(keys) if keys else None
+        key = self.info['replica_key']
+        return engines[key] if key is not None else None
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _remember_write(db_session):
+    # Keep the visitor on the primary until replicas have caught up
+    if db_session.info.get('wrote') and has_request_context():
+        session['primary_until'] = time.time() + current_app.config.get('REPLICA_STICKY_SECONDS', 10)
+
+
+def use_primary():
+    """Read everything else in this session from the primary, e.g. before a read-modify-write batch"""
+    from app import db
+    db.session.info['wrote'] = True
+
+
+def use_replica(view):
+    """
+    Let a view's GET requests read from a replica until they write
+
+    Apply it outside page_cache.cached so the cached page's generation is
+    read from the same database as the page's data.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method in ('GET', 'HEAD') and session.get('primary_until', 0) < time.time():
+            from app import db
+            db.session.info['use_replica'] = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def sync_sqlite_replicas():
+    """
+    Copy the primary SQLite database over every SQLite replica
+
+    Uses SQLite's online backup API, so the copy is consistent even while
+    the primary is being written. Run it periodically (e.g. from cron) to
+    simulate replication lag locally. Returns the replica file paths.
+    """
+    from app import db
+
+    engines = db.engines
+    primary = engines[None]
+    if primary.dialect.name != 'sqlite' or not primary.url.database:
+        raise RuntimeError('Replica sync needs a SQLite file as the primary database')
+
+    synced = []
+    source = sqlite3.connect(primary.url.database)
+    try:
+        for key in replica_bind_keys(engines):
+            engine = engines[key]
+            if engine.dialect.name != 'sqlite' or not engine.url.database:
+                continue
+            target = sqlite3.connect(engine.url.database)
+            try:
+                source.backup(target)
+            finally:
+                target.close()
+            synced.append(engine.url.database)
+    finally:
+        source.close()
+    return synced
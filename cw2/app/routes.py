@@ -1,13 +1,23 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
-from app.models import User, Post, Tag, Comment
+from app.models import User, Post, Tag, Comment, post_likes, bookmarks, comment_likes
 from app.forms import RegistrationForm, LoginForm, PostForm, CommentForm, UserSettingsForm, PasswordChangeForm
-from app.utils import render_markdown, time_ago, get_recommended_posts, get_hot_posts, get_text_preview, get_avatar_url, get_category_display, admin_required
+from app.leaderboard import hot_posts_board
+from app.suggest import suggestion_index
+from app.search import (fts_available, build_match_query, fts_filter, ranked_search_query,
+                        get_search_snippets, normalize_query, search_cache, CachedPagination)
+from app.cache import posts_generation, MISSING
+from app.page_cache import page_cache, post_group, LISTS
+from app.pagination import KeysetPagination
+from app.view_counter import view_counter
+from app.avatars import avatar_processor, detect_image_format
+from app.replicas import use_replica
+from app.timeline import timeline_pagination, fan_out_post, remove_post_entries, backfill_author, remove_author, invalidate_timeline
+from app.utils import render_post_content, get_post_html, time_ago, get_recommended_posts, get_hot_posts, get_post_preview, get_avatar_url, get_category_display, admin_required, build_comment_tree, invalidate_user_tags, release_post_counts, toggle_user_row, add_to_counters
 from datetime import datetime
+from sqlalchemy.orm import joinedload, selectinload, undefer
 from werkzeug.utils import secure_filename
-import os
-from pathlib import Path
 import re
 
 # Main blueprints
@@ -17,18 +27,35 @@ api = Blueprint('api', __name__)
 admin = Blueprint('admin', __name__)
 
 
+# Keyset orders for post lists; each ends in the unique ID so every row
+# has a distinct position
+POST_SORT_ORDERS = {
+    'latest': (Post.created_at.desc(), Post.id.desc()),
+    'comments': (Post.comment_count.desc(), Post.id.desc()),
+    'likes': (Post.like_count.desc(), Post.id.desc()),
+    'views': (Post.view_count.desc(), Post.id.desc()),
+    'hot': (Post.hot_score.desc(), Post.id.desc()),
+}
+
+
 # ==================== Main Routes ====================
 
 @main.route('/')
+@use_replica
+@page_cache.cached(LISTS)
 def index():
     """Homepage"""
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
+    feed = request.args.get('feed', 'all')
     sort = request.args.get('sort', 'latest')
     category = request.args.get('category', '')
     tag_name = request.args.get('tag', '')
     
-    # Build query
-    query = Post.query.filter_by(is_draft=False)
+    # Build query, batch-loading the author and tags shown on each card
+    query = Post.query.filter_by(is_draft=False).options(
+        joinedload(Post.author), selectinload(Post.tags)
+    )
     
     # Category filter - handle both English and Chinese category names
     if category:
@@ -51,37 +78,18 @@ def index():
             query = query.filter(Post.tags.contains(tag))
     
     # Sorting
-    if sort == 'comments':
-        query = query.order_by(Post.comment_count.desc())
-    elif sort == 'likes':
-        query = query.order_by(Post.like_count.desc())
-    elif sort == 'views':
-        query = query.order_by(Post.view_count.desc())
-    elif sort == 'hot':
-        # Hot sorting requires special handling
-        posts = query.all()
-        scored_posts = [(p, p.calculate_hot_score()) for p in posts]
-        scored_posts.sort(key=lambda x: x[1], reverse=True)
-        pagination = None
-        posts = [p for p, s in scored_posts]
-        total = len(posts)
-        start = (page - 1) * 20
-        end = start + 20
-        posts = posts[start:end]
-    else:  # latest
-        query = query.order_by(Post.created_at.desc())
-    
-    if sort != 'hot':
-        pagination = query.paginate(page=page, per_page=20, error_out=False)
-        posts = pagination.items
+    if sort not in POST_SORT_ORDERS:
+        sort = 'latest'
+    
+    if feed == 'following' and current_user.is_authenticated:
+        # Posts by followed authors, newest first, from the user's timeline
+        pagination = timeline_pagination(current_user, cursor=cursor, page=page, per_page=20)
     else:
-        pagination = type('obj', (object,), {
-            'page': page,
-            'pages': (total + 19) // 20,
-            'total': total,
-            'has_prev': page > 1,
-            'has_next': end < total
-        })()
+        feed = 'all'
+        # Post writes bump the generation, which also refreshes the cached count
+        pagination = KeysetPagination(query, POST_SORT_ORDERS[sort], cursor=cursor, page=page, per_page=20,
+                                      count_key=('index', posts_generation.value, category, tag_name))
+    posts = pagination.items
     
     # Get recommended posts (if user is logged in)
     recommended_posts = []
@@ -96,34 +104,50 @@ def index():
     return render_template('index.html', 
                          posts=posts, 
                          pagination=pagination,
+                         feed=feed,
                          sort=sort,
                          category=category,
                          tag_name=tag_name,
                          recommended_posts=recommended_posts,
                          hot_tags=hot_tags,
                          time_ago=time_ago,
-                         get_text_preview=get_text_preview,
+                         get_post_preview=get_post_preview,
                          get_category_display=get_category_display)
 
 
 @main.route('/post/<int:post_id>')
+@page_cache.cached(post_group, on_hit=lambda post_id: view_counter.add(post_id))
 def post_detail(post_id):
     """Post detail"""
-    post = Post.query.get_or_404(post_id)
+    post = Post.query.options(
+        undefer(Post.content_html), joinedload(Post.author), selectinload(Post.tags)
+    ).filter_by(id=post_id).first_or_404()
     
     # Increment view count
     post.increment_view()
+    hot_posts_board.update(post)
+    suggestion_index.update_post(post)
     
-    # Get comments (excluding deleted ones)
+    # Get comments (excluding deleted ones) in one query and thread them in memory
     comments = Comment.query.filter_by(
-        post_id=post_id, 
-        is_deleted=False,
-        parent_id=None
-    ).order_by(Comment.created_at.desc()).all()
+        post_id=post_id,
+        is_deleted=False
+    ).options(joinedload(Comment.author)).order_by(
+        Comment.created_at, Comment.id
+    ).all()
+    comment_tree = build_comment_tree(comments)
+    
+    # Viewer's like/bookmark state for everything on the page, one query each
+    post_liked = post_bookmarked = False
+    liked_comment_ids = set()
+    if current_user.is_authenticated:
+        post_liked = current_user.has_liked_post(post)
+        post_bookmarked = current_user.has_bookmarked(post)
+        liked_comment_ids = current_user.liked_comment_ids([c.id for c in comments])
     
     # Get related posts (based on tags)
     related_posts = []
-    if post.tags.count() > 0:
+    if post.tags:
         related_query = Post.query.filter(
             Post.id != post_id,
             Post.is_draft == False
@@ -136,10 +160,13 @@ def post_detail(post_id):
     
     return render_template('post_detail.html',
                          post=post,
-                         comments=comments,
+                         post_html=get_post_html(post),
+                         comment_tree=comment_tree,
+                         post_liked=post_liked,
+                         post_bookmarked=post_bookmarked,
+                         liked_comment_ids=liked_comment_ids,
                          related_posts=related_posts,
                          form=form,
-                         render_markdown=render_markdown,
                          time_ago=time_ago,
                          get_category_display=get_category_display)
 
@@ -158,6 +185,7 @@ def post_create():
             category=form.category.data,
             is_draft=bool(request.form.get('save_draft'))
         )
+        render_post_content(post)
         
         # Process tags
         tag_names = [t.strip() for t in form.tags.data.split(',') if t.strip()]
@@ -179,7 +207,16 @@ def post_create():
                 tag.increment_usage()
         
         db.session.add(post)
+        if not post.is_draft:
+            current_user.adjust_counts(posts_count=1)
+            fan_out_post(post)
         db.session.commit()
+        hot_posts_board.update(post)
+        suggestion_index.update_post(post)
+        suggestion_index.update_tags(post.tags)
+        posts_generation.bump()
+        page_cache.invalidate_post(post.id)
+        invalidate_user_tags(current_user)
         
         flash('Post published successfully!', 'success')
         return redirect(url_for('main.post_detail', post_id=post.id))
@@ -206,6 +243,7 @@ def post_edit(post_id):
         post.content = form.content.data
         post.category = form.category.data
         post.updated_at = datetime.utcnow()
+        render_post_content(post)
         
         # Update tags
         old_tags = list(post.tags)
@@ -234,6 +272,12 @@ def post_edit(post_id):
                 tag.increment_usage()
         
         db.session.commit()
+        hot_posts_board.update(post)
+        suggestion_index.update_post(post)
+        suggestion_index.update_tags(set(old_tags) | set(post.tags))
+        posts_generation.bump()
+        page_cache.invalidate_post(post.id)
+        invalidate_user_tags(current_user)
         flash('Post updated successfully!', 'success')
         return redirect(url_for('main.post_detail', post_id=post.id))
     
@@ -258,12 +302,20 @@ def post_delete(post_id):
         abort(403)
     
     # Remove tag associations
-    for tag in list(post.tags):
+    old_tags = list(post.tags)
+    for tag in old_tags:
         post.tags.remove(tag)
         tag.decrement_usage()
     
+    release_post_counts(post)
+    remove_post_entries(post.id)
     db.session.delete(post)
     db.session.commit()
+    hot_posts_board.remove(post_id)
+    suggestion_index.remove_post(post_id)
+    suggestion_index.update_tags(old_tags)
+    posts_generation.bump()
+    page_cache.invalidate_post(post_id)
     
     flash('Post deleted', 'success')
     return redirect(url_for('main.index'))
@@ -293,8 +345,13 @@ def comment_create(post_id):
         )
         
         post.comment_count += 1
+        post.update_hot_score()
         db.session.add(comment)
+        current_user.adjust_counts(comments_count=1)
         db.session.commit()
+        hot_posts_board.update(post)
+        suggestion_index.update_post(post)
+        page_cache.invalidate_post(post_id)
         
         flash('Comment posted successfully!', 'success')
     
@@ -314,6 +371,7 @@ def comment_edit(comment_id):
         comment.content = request.form.get('content')
         comment.updated_at = datetime.utcnow()
         db.session.commit()
+        page_cache.invalidate_post(comment.post_id, lists=False)
         flash('Comment updated successfully!', 'success')
         return redirect(url_for('main.post_detail', post_id=comment.post_id))
     
@@ -329,37 +387,41 @@ def comment_delete(comment_id):
     if comment.author != current_user and not current_user.is_admin:
         abort(403)
     
-    comment.is_deleted = True
-    comment.post.comment_count -= 1
+    if not comment.is_deleted:
+        comment.is_deleted = True
+        comment.post.comment_count -= 1
+        comment.post.update_hot_score()
+        comment.author.adjust_counts(comments_count=-1)
     db.session.commit()
+    hot_posts_board.update(comment.post)
+    suggestion_index.update_post(comment.post)
+    page_cache.invalidate_post(comment.post_id)
     
     flash('Comment deleted', 'success')
     return redirect(url_for('main.post_detail', post_id=comment.post_id))
 
 
 @main.route('/tag/<tag_name>')
+@use_replica
+@page_cache.cached(LISTS)
 def tag_detail(tag_name):
     """Tag detail page"""
     tag = Tag.query.filter_by(name=tag_name).first_or_404()
     
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     sort = request.args.get('sort', 'latest')
     
     query = Post.query.filter(
         Post.is_draft == False,
         Post.tags.contains(tag)
-    )
+    ).options(joinedload(Post.author))
     
-    if sort == 'comments':
-        query = query.order_by(Post.comment_count.desc())
-    elif sort == 'likes':
-        query = query.order_by(Post.like_count.desc())
-    elif sort == 'views':
-        query = query.order_by(Post.view_count.desc())
-    else:
-        query = query.order_by(Post.created_at.desc())
+    if sort not in POST_SORT_ORDERS or sort == 'hot':
+        sort = 'latest'
     
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
+    pagination = KeysetPagination(query, POST_SORT_ORDERS[sort], cursor=cursor, page=page, per_page=20,
+                                  count_key=('tag', posts_generation.value, tag.id))
     posts = pagination.items
     
     return render_template('tag_detail.html',
@@ -372,33 +434,33 @@ def tag_detail(tag_name):
 
 
 @main.route('/user/<username>')
+@use_replica
 def user_profile(username):
     """User profile"""
     user = User.query.filter_by(username=username).first_or_404()
     
     page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     tab = request.args.get('tab', 'posts')
     
     if tab == 'posts':
-        pagination = user.posts.filter_by(is_draft=False).order_by(
-            Post.created_at.desc()
-        ).paginate(page=page, per_page=20, error_out=False)
+        pagination = KeysetPagination(user.posts.filter_by(is_draft=False), POST_SORT_ORDERS['latest'],
+                                      cursor=cursor, page=page, per_page=20, total=user.posts_count)
         items = pagination.items
     elif tab == 'bookmarks' and current_user == user:
-        pagination = user.bookmarked_posts.filter_by(is_draft=False).order_by(
-            Post.created_at.desc()
-        ).paginate(page=page, per_page=20, error_out=False)
+        pagination = KeysetPagination(user.bookmarked_posts.filter_by(is_draft=False), POST_SORT_ORDERS['latest'],
+                                      cursor=cursor, page=page, per_page=20)
         items = pagination.items
     else:
         pagination = None
         items = []
     
-    # Statistics
+    # Statistics (denormalized on the user row)
     stats = {
-        'posts_count': user.posts.filter_by(is_draft=False).count(),
-        'comments_count': user.comments.filter_by(is_deleted=False).count(),
-        'following_count': user.following.count(),
-        'followers_count': user.followers.count()
+        'posts_count': user.posts_count,
+        'comments_count': user.comments_count,
+        'following_count': user.following_count,
+        'followers_count': user.followers_count
     }
     
     is_following = False
@@ -430,55 +492,21 @@ def settings():
         if 'avatar' in request.files:
             file = request.files['avatar']
             if file and file.filename:
-                # Check file extension (from original filename, without secure_filename processing)
-                original_filename = file.filename
-                if '.' not in original_filename:
-                    flash('File format not supported. Please upload JPG, PNG or GIF images', 'error')
-                    return render_template('user_settings.html', form=form, password_form=password_form)
-                
-                file_ext = original_filename.rsplit('.', 1)[1].lower()
-                # Unify jpg and jpeg
-                if file_ext == 'jpeg':
-                    file_ext = 'jpg'
-                
-                # Check extension (after unification)
-                allowed_exts = {'png', 'jpg', 'gif'}
-                if file_ext not in allowed_exts:
-                    flash(f'File format not supported (current: .{file_ext}). Please upload JPG, PNG or GIF images', 'error')
-                    return render_template('user_settings.html', form=form, password_form=password_form)
-                
-                # Check file size
-                file.seek(0, os.SEEK_END)
-                file_size = file.tell()
-                file.seek(0)
-                if file_size > current_app.config['MAX_AVATAR_SIZE']:
+                # Check file size (read one byte past the limit to detect larger files)
+                max_size = current_app.config['MAX_AVATAR_SIZE']
+                data = file.read(max_size + 1)
+                if len(data) > max_size:
                     flash('Image file too large. Please upload an image smaller than 2MB', 'error')
-                    return render_template('user_settings.html', form=form, password_form=password_form)
-                
-                # Ensure upload directory exists
-                upload_folder = Path(current_app.config['UPLOAD_FOLDER'])
-                upload_folder.mkdir(parents=True, exist_ok=True)
-                
-                # Use user ID and current timestamp to ensure uniqueness
-                new_filename = f'avatar_{current_user.id}_{datetime.utcnow().strftime("%Y%m%d%H%M%S")}.{file_ext}'
-                filepath = upload_folder / new_filename
+                    return render_template('user_settings.html', form=form, password_form=password_form, get_avatar_url=get_avatar_url)
                 
-                # Save file
-                file.save(str(filepath))
-                
-                # Delete old avatar (if not default avatar)
-                if current_user.avatar_url and current_user.avatar_url != 'default_avatar.png':
-                    old_avatar_path = upload_folder / current_user.avatar_url
-                    if old_avatar_path.exists():
-                        try:
-                            old_avatar_path.unlink()
-                        except:
-                            pass  # Ignore deletion errors
+                # Check the real format from the file contents, not the extension
+                if detect_image_format(data) is None:
+                    flash('File format not supported. Please upload JPG, PNG or GIF images', 'error')
+                    return render_template('user_settings.html', form=form, password_form=password_form, get_avatar_url=get_avatar_url)
                 
-                # Update user avatar URL (only save filename, not path)
-                current_user.avatar_url = new_filename
-                db.session.commit()
-                flash('Avatar uploaded successfully!', 'success')
+                # Thumbnails are rendered in the background; the old avatar shows until they are ready
+                avatar_processor.submit(current_user.id, data)
+                flash('Avatar uploaded successfully! It may take a few seconds to appear.', 'success')
                 return redirect(url_for('main.settings'))
         else:
             flash('Please select an image to upload', 'error')
@@ -489,13 +517,13 @@ def settings():
             if User.query.filter(User.username == form.username.data, 
                                User.id != current_user.id).first():
                 flash('This username is already taken', 'error')
-                return render_template('user_settings.html', form=form, password_form=password_form)
+                return render_template('user_settings.html', form=form, password_form=password_form, get_avatar_url=get_avatar_url)
         
         if form.email.data != current_user.email:
             if User.query.filter(User.email == form.email.data, 
                                User.id != current_user.id).first():
                 flash('This email is already registered', 'error')
-                return render_template('user_settings.html', form=form, password_form=password_form)
+                return render_template('user_settings.html', form=form, password_form=password_form, get_avatar_url=get_avatar_url)
         
         current_user.username = form.username.data
         current_user.email = form.email.data
@@ -507,7 +535,7 @@ def settings():
     if password_form.validate_on_submit():
         if not current_user.check_password(password_form.old_password.data):
             flash('Current password is incorrect', 'error')
-            return render_template('user_settings.html', form=form, password_form=password_form)
+            return render_template('user_settings.html', form=form, password_form=password_form, get_avatar_url=get_avatar_url)
         
         current_user.set_password(password_form.new_password.data)
         db.session.commit()
@@ -519,33 +547,58 @@ def settings():
     form.email.data = current_user.email
     form.bio.data = current_user.bio
     
-    return render_template('user_settings.html', form=form, password_form=password_form)
+    return render_template('user_settings.html', form=form, password_form=password_form, get_avatar_url=get_avatar_url)
 
 
 @main.route('/search')
+@use_replica
 def search():
     """Search"""
-    query = request.args.get('q', '').strip()
+    query = normalize_query(request.args.get('q', ''))
     page = request.args.get('page', 1, type=int)
     
     if not query:
-        return render_template('search.html', query=query, posts=[], pagination=None, get_text_preview=get_text_preview, get_category_display=get_category_display)
-    
-    # Search post titles and content
-    posts = Post.query.filter(
-        Post.is_draft == False,
-        (Post.title.contains(query) | Post.content.contains(query))
-    ).order_by(Post.created_at.desc())
-    
-    pagination = posts.paginate(page=page, per_page=20, error_out=False)
+        return render_template('search.html', query=query, posts=[], pagination=None, snippets={}, get_post_preview=get_post_preview, get_category_display=get_category_display)
+    
+    snippets = {}
+    # Full-text index, ranked by relevance with highlighted excerpts, unless
+    # the query has words too short for it
+    match_query = build_match_query(query) if fts_available() else None
+    if match_query:
+        cache_key = (posts_generation.value, match_query.lower(), page, 'relevance')
+    else:
+        cache_key = (posts_generation.value, query, page, 'newest')
+    
+    # Repeated searches only load the posts on the page, by primary key
+    cached = search_cache.get(cache_key)
+    if cached is not MISSING:
+        ids, total = cached
+        pagination = CachedPagination(page=page, per_page=20, ids=ids, total=total,
+                                      options=[joinedload(Post.author)])
+    else:
+        if match_query:
+            posts = ranked_search_query(match_query).filter(
+                Post.is_draft == False
+            ).options(joinedload(Post.author))
+        else:
+            # Search post titles and content
+            posts = Post.query.filter(
+                Post.is_draft == False,
+                (Post.title.contains(query) | Post.content.contains(query))
+            ).options(joinedload(Post.author)).order_by(Post.created_at.desc())
+        pagination = posts.paginate(page=page, per_page=20, error_out=False)
+        search_cache.set(cache_key, ([post.id for post in pagination.items], pagination.total))
     posts = pagination.items
+    if match_query:
+        snippets = get_search_snippets(match_query, [post.id for post in posts])
     
     return render_template('search.html',
                          query=query,
                          posts=posts,
                          pagination=pagination,
+                         snippets=snippets,
                          time_ago=time_ago,
-                         get_text_preview=get_text_preview,
+                         get_post_preview=get_post_preview,
                          get_category_display=get_category_display)
 
 
@@ -560,7 +613,9 @@ def follow_user(username):
         return redirect(url_for('main.user_profile', username=username))
     
     if current_user.follow(user):
+        backfill_author(current_user, user)
         db.session.commit()
+        invalidate_timeline(current_user.id)
         flash(f'Now following {user.username}', 'success')
     else:
         flash('You are already following this user', 'info')
@@ -575,7 +630,9 @@ def unfollow_user(username):
     user = User.query.filter_by(username=username).first_or_404()
     
     if current_user.unfollow(user):
+        remove_author(current_user, user)
         db.session.commit()
+        invalidate_timeline(current_user.id)
         flash(f'Unfollowed {user.username}', 'success')
     
     return redirect(url_for('main.user_profile', username=username))
@@ -652,22 +709,24 @@ def logout():
 @login_required
 def like_post(post_id):
     """Like post (AJAX)"""
-    post = Post.query.get_or_404(post_id)
-    
-    if current_user in post.liked_by:
-        post.liked_by.remove(current_user)
-        post.like_count -= 1
-        liked = False
-    else:
-        post.liked_by.append(current_user)
-        post.like_count += 1
-        liked = True
-    
+    posts = Post.__table__
+    delta = toggle_user_row(post_likes, current_user.id, post_likes.c.post_id, posts, post_id)
+    
+    # The like moves hot_score by the formula's recency-weighted gain, in the same UPDATE
+    post = add_to_counters(posts, post_id,
+                           (posts.c.id, posts.c.title, posts.c.hot_score, posts.c.is_draft, posts.c.like_count),
+                           like_count=delta, hot_score=Post.hot_score_gain(likes=delta))
+    if post is None:
+        abort(404)
     db.session.commit()
+    hot_posts_board.update(post)
+    suggestion_index.update_post(post)
+    page_cache.invalidate_post(post_id)
+    invalidate_user_tags(current_user)
     
     return jsonify({
         'success': True,
-        'liked': liked,
+        'liked': delta > 0,
         'like_count': post.like_count
     })
 
@@ -676,16 +735,13 @@ def like_post(post_id):
 @login_required
 def bookmark_post(post_id):
     """Bookmark post (AJAX)"""
-    post = Post.query.get_or_404(post_id)
-    
-    if current_user in post.bookmarked_by:
-        post.bookmarked_by.remove(current_user)
-        bookmarked = False
-    else:
-        post.bookmarked_by.append(current_user)
-        bookmarked = True
+    delta = toggle_user_row(bookmarks, current_user.id, bookmarks.c.post_id, Post.__table__, post_id)
+    if delta == 0 and db.session.get(Post, post_id) is None:
+        abort(404)
+    bookmarked = delta > 0
     
     db.session.commit()
+    invalidate_user_tags(current_user)
     
     return jsonify({
         'success': True,
@@ -697,27 +753,58 @@ def bookmark_post(post_id):
 @login_required
 def like_comment(comment_id):
     """Like comment (AJAX)"""
-    comment = Comment.query.get_or_404(comment_id)
-    
-    if current_user in comment.liked_by:
-        comment.liked_by.remove(current_user)
-        comment.like_count -= 1
-        liked = False
-    else:
-        comment.liked_by.append(current_user)
-        comment.like_count += 1
-        liked = True
+    comments = Comment.__table__
+    delta = toggle_user_row(comment_likes, current_user.id, comment_likes.c.comment_id, comments, comment_id)
     
+    comment = add_to_counters(comments, comment_id, (comments.c.post_id, comments.c.like_count),
+                              like_count=delta)
+    if comment is None:
+        abort(404)
     db.session.commit()
+    page_cache.invalidate_post(comment.post_id, lists=False)
     
     return jsonify({
         'success': True,
-        'liked': liked,
+        'liked': delta > 0,
         'like_count': comment.like_count
     })
 
 
+@api.route('/posts', methods=['GET'])
+def list_posts():
+    """Post list page (AJAX), paged with opaque cursors"""
+    sort = request.args.get('sort', 'latest')
+    tag_name = request.args.get('tag', '')
+    
+    if sort not in POST_SORT_ORDERS:
+        sort = 'latest'
+    
+    query = Post.query.filter_by(is_draft=False).options(joinedload(Post.author))
+    if tag_name:
+        query = query.filter(Post.tags.any(Tag.name == tag_name))
+    
+    pagination = KeysetPagination(query, POST_SORT_ORDERS[sort],
+                                  cursor=request.args.get('cursor'), per_page=20)
+    
+    return jsonify({
+        'posts': [{
+            'id': post.id,
+            'title': post.title,
+            'author': post.author.username,
+            'preview': get_post_preview(post, 200),
+            'created_at': post.created_at.isoformat(),
+            'like_count': post.like_count,
+            'comment_count': post.comment_count,
+            'view_count': post.view_count,
+            'url': f'/post/{post.id}'
+        } for post in pagination.items],
+        'next_cursor': pagination.next_cursor,
+        'prev_cursor': pagination.prev_cursor
+    })
+
+
 @api.route('/search/suggest', methods=['GET'])
+@use_replica
 def search_suggest():
     """Search suggestions (AJAX)"""
     query = request.args.get('q', '').strip()
@@ -725,26 +812,20 @@ def search_suggest():
     if len(query) < 2:
         return jsonify({'suggestions': []})
     
-    # 搜索标签
-    tags = Tag.query.filter(Tag.name.contains(query)).limit(5).all()
-    
-    # 搜索帖子标题
-    posts = Post.query.filter(
-        Post.is_draft == False,
-        Post.title.contains(query)
-    ).limit(5).all()
+    # Served from the in-memory substring index, no database round trip
+    tags, posts = suggestion_index.suggest(query, limit=5)
     
     suggestions = []
     for tag in tags:
         suggestions.append({
             'type': 'tag',
-            'text': tag.name,
-            'url': f'/tag/{tag.name}'
+            'text': tag.text,
+            'url': f'/tag/{tag.text}'
         })
     for post in posts:
         suggestions.append({
             'type': 'post',
-            'text': post.title,
+            'text': post.text,
             'url': f'/post/{post.id}'
         })
     
@@ -770,7 +851,9 @@ def admin_dashboard():
     }
     
     # Recent posts
-    recent_posts = Post.query.order_by(Post.created_at.desc()).limit(10).all()
+    recent_posts = Post.query.options(joinedload(Post.author)).order_by(
+        Post.created_at.desc()
+    ).limit(10).all()
     
     # Recent users
     recent_users = User.query.order_by(User.created_at.desc()).limit(10).all()
@@ -792,19 +875,24 @@ def admin_posts():
     search = request.args.get('search', '')
     category = request.args.get('category', '')
     
-    query = Post.query
+    query = Post.query.options(joinedload(Post.author))
     
     if search:
-        query = query.filter(
-            (Post.title.contains(search)) | 
-            (Post.content.contains(search))
-        )
+        match_query = build_match_query(search) if fts_available() else None
+        if match_query:
+            query = query.filter(fts_filter(match_query))
+        else:
+            query = query.filter(
+                (Post.title.contains(search)) | 
+                (Post.content.contains(search))
+            )
     
     if category:
         query = query.filter_by(category=category)
     
-    query = query.order_by(Post.created_at.desc())
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
+    pagination = KeysetPagination(query, POST_SORT_ORDERS['latest'],
+                                  cursor=request.args.get('cursor'), page=page, per_page=20,
+                                  count_key=('admin_posts', posts_generation.value, search, category))
     posts = pagination.items
     
     return render_template('admin/posts.html',
@@ -824,12 +912,20 @@ def admin_delete_post(post_id):
     post = Post.query.get_or_404(post_id)
     
     # Remove tag associations
-    for tag in list(post.tags):
+    old_tags = list(post.tags)
+    for tag in old_tags:
         post.tags.remove(tag)
         tag.decrement_usage()
     
+    release_post_counts(post)
+    remove_post_entries(post.id)
     db.session.delete(post)
     db.session.commit()
+    hot_posts_board.remove(post_id)
+    suggestion_index.remove_post(post_id)
+    suggestion_index.update_tags(old_tags)
+    posts_generation.bump()
+    page_cache.invalidate_post(post_id)
     
     flash('Post deleted successfully', 'success')
     return redirect(url_for('admin.admin_posts'))
@@ -843,6 +939,7 @@ def admin_pin_post(post_id):
     post = Post.query.get_or_404(post_id)
     post.is_pinned = not post.is_pinned
     db.session.commit()
+    page_cache.invalidate_post(post_id)
     
     action = 'pinned' if post.is_pinned else 'unpinned'
     flash(f'Post {action} successfully', 'success')
@@ -865,8 +962,9 @@ def admin_users():
             (User.email.contains(search))
         )
     
-    query = query.order_by(User.created_at.desc())
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
+    pagination = KeysetPagination(query, (User.created_at.desc(), User.id.desc()),
+                                  cursor=request.args.get('cursor'), page=page, per_page=20,
+                                  count_key=('admin_users', search))
     users = pagination.items
     
     return render_template('admin/users.html',
@@ -922,13 +1020,14 @@ def admin_comments():
     page = request.args.get('page', 1, type=int)
     search = request.args.get('search', '')
     
-    query = Comment.query
+    query = Comment.query.options(joinedload(Comment.author), joinedload(Comment.post))
     
     if search:
         query = query.filter(Comment.content.contains(search))
     
-    query = query.order_by(Comment.created_at.desc())
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
+    pagination = KeysetPagination(query, (Comment.created_at.desc(), Comment.id.desc()),
+                                  cursor=request.args.get('cursor'), page=page, per_page=20,
+                                  count_key=('admin_comments', search))
     comments = pagination.items
     
     return render_template('admin/comments.html',
@@ -945,10 +1044,17 @@ def admin_delete_comment(comment_id):
     """Admin delete comment"""
     comment = Comment.query.get_or_404(comment_id)
     
-    comment.is_deleted = True
-    if comment.post:
-        comment.post.comment_count = max(0, comment.post.comment_count - 1)
+    if not comment.is_deleted:
+        comment.is_deleted = True
+        if comment.post:
+            comment.post.comment_count = max(0, comment.post.comment_count - 1)
+            comment.post.update_hot_score()
+        comment.author.adjust_counts(comments_count=-1)
     db.session.commit()
+    if comment.post:
+        hot_posts_board.update(comment.post)
+        suggestion_index.update_post(comment.post)
+        page_cache.invalidate_post(comment.post_id)
     
     flash('Comment deleted successfully', 'success')
     return redirect(url_for('admin.admin_comments'))
@@ -967,8 +1073,10 @@ def admin_tags():
     if search:
         query = query.filter(Tag.name.contains(search))
     
-    query = query.order_by(Tag.usage_count.desc(), Tag.name.asc())
-    pagination = query.paginate(page=page, per_page=20, error_out=False)
+    # Tag names are unique, so they break ties on their own
+    pagination = KeysetPagination(query, (Tag.usage_count.desc(), Tag.name.asc()),
+                                  cursor=request.args.get('cursor'), page=page, per_page=20,
+                                  count_key=('admin_tags', search))
     tags = pagination.items
     
     return render_template('admin/tags.html',
@@ -990,6 +1098,7 @@ def admin_delete_tag(tag_id):
     
     db.session.delete(tag)
     db.session.commit()
+    suggestion_index.remove_tag(tag_id)
     
     flash('Tag deleted successfully', 'success')
     return redirect(url_for('admin.admin_tags'))
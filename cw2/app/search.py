@@ -0,0 +1,195 @@
+import re
+from math import ceil
+from markupsafe import Markup, escape
+from sqlalchemy import column, func, literal_column, select, table, text
+from app import db
+from app.cache import TTLCache
+from app.models import Post
+from app.pagination import iter_page_numbers
+
+# External-content FTS5 index over posts(title, content), kept in sync by triggers.
+# The trigram tokenizer matches any substring of 3+ characters, so words
+# inside unspaced text such as Chinese are found too.
+FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""",
+]
+
+posts_fts = table('posts_fts', column('rowid'), column('title'), column('content'))
+_fts_table = literal_column('posts_fts')
+
+# Title matches weigh more than body matches in BM25 ranking
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+
+# Control characters marking highlights, replaced after HTML escaping
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+# Shortest word the trigram index can match
+MIN_MATCH_LENGTH = 3
+
+# Database URL -> (schema version, whether the trigram FTS table exists)
+_fts_available = {}
+
+# (generation, normalized query, page, sort) -> (post IDs on the page, total)
+search_cache = TTLCache(ttl=300, maxsize=512)
+
+
+def fts_available():
+    """
+    Check whether full-text search can be used on the current database
+
+    The answer is cached per database until its schema version changes,
+    so a migration or rebuild_fts_index() is picked up without a restart.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    url = str(db.engine.url)
+    with db.engine.connect() as conn:
+        version = conn.exec_driver_sql('PRAGMA schema_version').scalar()
+        cached = _fts_available.get(url)
+        if cached is None or cached[0] != version:
+            sql = conn.execute(text(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'"
+            )).scalar()
+            # An index left over from before the trigram migration can't match CJK
+            cached = _fts_available[url] = (version, bool(sql) and 'trigram' in sql)
+    return cached[1]
+
+
+def rebuild_fts_index():
+    """Recreate the FTS table, create its triggers if needed and reindex every post"""
+    if db.engine.dialect.name != 'sqlite':
+        raise RuntimeError('Full-text search index requires SQLite')
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS posts_fts'))
+        for statement in FTS_DDL:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+
+
+def build_match_query(query):
+    """
+    Turn free text into a safe FTS5 MATCH expression
+
+    Every word is quoted (so FTS syntax in user input is inert) and
+    matched anywhere in the text, and all words must appear. Returns None
+    when the index can't answer the query, because it has no words or a
+    word shorter than MIN_MATCH_LENGTH; callers fall back to LIKE.
+    """
+    words = re.findall(r'\w+', query)
+    if not words or any(len(word) < MIN_MATCH_LENGTH for word in words):
+        return None
+    return ' '.join('"{}"'.format(word) for word in words)
+
+
+def fts_filter(match_query):
+    """Filter clause restricting Post to rows matching the FTS query"""
+    return Post.id.in_(
+        select(posts_fts.c.rowid).where(_fts_table.op('MATCH')(match_query))
+    )
+
+
+def ranked_search_query(match_query):
+    """Post query matching the FTS query, most relevant first"""
+    return Post.query.join(posts_fts, posts_fts.c.rowid == Post.id).filter(
+        _fts_table.op('MATCH')(match_query)
+    ).order_by(func.bm25(_fts_table, TITLE_WEIGHT, CONTENT_WEIGHT), Post.id.desc())
+
+
+def get_search_snippets(match_query, post_ids, tokens=12):
+    """Highlighted content excerpts for matched posts, keyed by post ID"""
+    if not post_ids:
+        return {}
+    rows = db.session.execute(
+        select(
+            posts_fts.c.rowid,
+            func.snippet(_fts_table, 1, _MARK_START, _MARK_END, '…', tokens)
+        ).where(
+            _fts_table.op('MATCH')(match_query),
+            posts_fts.c.rowid.in_(list(post_ids))
+        )
+    )
+    snippets = {}
+    for post_id, snippet in rows:
+        if not snippet or _MARK_START not in snippet:
+            continue  # Matched on title only, the plain preview reads better
+        html = str(escape(snippet))
+        html = html.replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+        snippets[post_id] = Markup(html)
+    return snippets
+
+
+def normalize_query(query):
+    """Collapse whitespace so equivalent queries share cache entries"""
+    return ' '.join(query.split())
+
+
+class CachedPagination:
+    """
+    One page of search results rebuilt from cached post IDs and total count
+
+    Only the posts on the page are loaded, by primary key, in cached order.
+    Offers the same page attributes as the other paginations, with plain
+    page-number links.
+    """
+
+    # No keyset cursors; templates link to page numbers instead
+    prev_cursor = next_cursor = last_cursor = None
+    total_is_estimate = False
+
+    def __init__(self, page, per_page, ids, total, options=()):
+        self.page = max(page, 1)
+        self.per_page = per_page
+        self.total = total
+        self.items = self._load(ids, options)
+
+    @staticmethod
+    def _load(ids, options):
+        if not ids:
+            return []
+        posts = Post.query.filter(Post.id.in_(ids)).options(*options).all()
+        by_id = {post.id: post for post in posts}
+        return [by_id[post_id] for post_id in ids if post_id in by_id]
+
+    def __iter__(self):
+        return iter(self.items)
+
+    @property
+    def pages(self):
+        return ceil(self.total / self.per_page) if self.total else 0
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def has_next(self):
+        return self.page < self.pages
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """Page numbers to link to, with None for skipped ranges"""
+        return iter_page_numbers(self.page, self.pages, left_edge, left_current,
+                                 right_current, right_edge)
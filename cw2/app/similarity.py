@@ -0,0 +1,90 @@
+import heapq
+from collections import defaultdict
+from math import sqrt
+
+from sqlalchemy import select, union
+from app import db
+from app.models import post_likes, bookmarks, follows
+
+
+def _interactions():
+    """
+    Union of every user -> item interaction as (user_id, item_id) rows
+
+    Liked and bookmarked posts use the post ID as item ID. Followed users
+    are stored as negative IDs, so one integer column covers both kinds.
+    UNION removes duplicates, so liking and bookmarking a post counts once.
+    """
+    return union(
+        select(post_likes.c.user_id.label('user_id'),
+               post_likes.c.post_id.label('item_id')),
+        select(bookmarks.c.user_id, bookmarks.c.post_id),
+        select(follows.c.follower_id, -follows.c.following_id),
+    ).subquery('interactions')
+
+
+class InteractionMatrix:
+    """Sparse user x item matrix of likes, bookmarks and follows"""
+
+    def __init__(self, rows=()):
+        self.user_items = defaultdict(set)  # user id -> {item id}
+        self.item_users = defaultdict(set)  # item id -> {user id}
+        for user_id, item_id in rows:
+            self.user_items[user_id].add(item_id)
+            self.item_users[item_id].add(user_id)
+
+    @classmethod
+    def load(cls):
+        """Load the full matrix in a single query"""
+        interactions = _interactions()
+        rows = db.session.execute(
+            select(interactions.c.user_id, interactions.c.item_id)
+        ).all()
+        return cls(rows)
+
+    @classmethod
+    def load_for_user(cls, user_id):
+        """
+        Load only the rows needed to score neighbours of one user
+
+        That is the user's own row plus the full rows of every user who
+        shares at least one item with them, all in a single query.
+        """
+        interactions = _interactions()
+        mine = select(interactions.c.item_id).where(interactions.c.user_id == user_id)
+        neighbours = select(interactions.c.user_id).where(interactions.c.item_id.in_(mine))
+        rows = db.session.execute(
+            select(interactions.c.user_id, interactions.c.item_id).where(
+                interactions.c.user_id.in_(neighbours)
+            )
+        ).all()
+        return cls(rows)
+
+    def post_ids(self, user_id):
+        """Liked or bookmarked post IDs of a user"""
+        return {item for item in self.user_items.get(user_id, ()) if item > 0}
+
+    def similar_users(self, user_id, limit=10):
+        """
+        Return up to limit (user_id, cosine similarity) pairs, most similar first
+
+        Overlaps are accumulated through the inverted index, so only users
+        sharing an item with user_id are ever visited.
+        """
+        mine = self.user_items.get(user_id)
+        if not mine:
+            return []
+
+        overlap = defaultdict(int)
+        for item in mine:
+            for other in self.item_users[item]:
+                if other != user_id:
+                    overlap[other] += 1
+
+        norm = sqrt(len(mine))
+        scores = [
+            (count / (norm * sqrt(len(self.user_items[other]))), other)
+            for other, count in overlap.items()
+        ]
+        best = heapq.nlargest(limit, scores, key=lambda pair: (pair[0], -pair[1]))
+        return [(other, score) for score, other in best]
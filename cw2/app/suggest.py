@@ -0,0 +1,172 @@
+import heapq
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from app.cache import posts_generation
+
+# One indexed tag or post title; score is usage_count or hot_score
+Suggestion = namedtuple('Suggestion', ['kind', 'id', 'text', 'score', 'tokens'])
+
+
+def tokenize(text):
+    """Lowercased word tokens of a tag name or title"""
+    return tuple(dict.fromkeys(re.findall(r'\w+', (text or '').lower())))
+
+
+def suffixes(tokens):
+    """Every suffix of every token; a prefix of one is a substring of the token"""
+    return {token[start:] for token in tokens for start in range(len(token))}
+
+
+class SuggestionIndex:
+    """
+    Process-wide substring index over tag names and published post titles
+
+    Every suffix of every word of a name or title is kept in one sorted
+    list of (suffix, kind, id) keys, so a lookup is a bisect plus a scan
+    of the run of suffixes starting with the query word. That finds the
+    word anywhere inside a longer word ('minton' in 'badminton') or inside
+    unspaced text such as Chinese, like the LIKE query it replaces.
+
+    Write paths keep it current through update_post(), update_tags() and
+    the remove methods. Titles and tags only change with writes that bump
+    the shared posts generation, so every worker reloads its index when
+    that moves; score changes from likes and comments reach the other
+    workers when the TTL expires.
+    """
+
+    def __init__(self, ttl=600):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._items = {}   # (kind, id) -> Suggestion
+        self._tokens = []  # sorted (token, kind, id) keys
+        self._loaded_at = None
+        self._generation = None  # Posts generation the index was loaded at
+
+    def init_app(self, app):
+        """Read index settings from app config"""
+        self.ttl = app.config.get('SUGGESTION_INDEX_TTL', self.ttl)
+
+    def is_stale(self):
+        """Check whether the index needs reloading from the database"""
+        return (self._loaded_at is None or
+                datetime.utcnow() - self._loaded_at > timedelta(seconds=self.ttl) or
+                posts_generation.value != self._generation)
+
+    def invalidate(self):
+        """Force a reload on the next lookup in this worker"""
+        with self._lock:
+            self._loaded_at = None
+
+    def rebuild(self):
+        """Reload every tag and published post title from the database"""
+        from app import db
+        from app.models import Post, Tag
+
+        # Read first, so a change landing during the load triggers another one
+        generation = posts_generation.value
+        items = {}
+        for row in db.session.query(Tag.id, Tag.name, Tag.usage_count):
+            items[('tag', row.id)] = Suggestion('tag', row.id, row.name,
+                                                row.usage_count or 0, tokenize(row.name))
+        for row in db.session.query(Post.id, Post.title, Post.hot_score).filter(Post.is_draft == False):
+            items[('post', row.id)] = Suggestion('post', row.id, row.title,
+                                                 row.hot_score or 0, tokenize(row.title))
+
+        tokens = sorted((suffix, item.kind, item.id)
+                        for item in items.values() for suffix in suffixes(item.tokens))
+        with self._lock:
+            self._items = items
+            self._tokens = tokens
+            self._loaded_at = datetime.utcnow()
+            self._generation = generation
+
+    def _discard(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            for suffix in suffixes(item.tokens):
+                index = bisect_left(self._tokens, (suffix, item.kind, item.id))
+                del self._tokens[index]
+
+    def _put(self, item):
+        key = (item.kind, item.id)
+        current = self._items.get(key)
+        if current is not None and current.tokens == item.tokens:
+            # Same words, only the text or score moved; no re-sorting needed
+            self._items[key] = item
+            return
+        self._discard(key)
+        self._items[key] = item
+        for suffix in suffixes(item.tokens):
+            insort(self._tokens, (suffix, item.kind, item.id))
+
+    def update_post(self, post):
+        """Apply a changed title, hot score or draft flag for a post"""
+        with self._lock:
+            if self._loaded_at is None:
+                return  # Not loaded yet, next lookup rebuilds from the database
+            if post.is_draft:
+                self._discard(('post', post.id))
+                return
+            self._put(Suggestion('post', post.id, post.title,
+                                 post.hot_score or 0, tokenize(post.title)))
+
+    def update_tags(self, tags):
+        """Apply changed usage counts for tags, adding new ones"""
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            for tag in tags:
+                self._put(Suggestion('tag', tag.id, tag.name,
+                                     tag.usage_count or 0, tokenize(tag.name)))
+
+    def remove_post(self, post_id):
+        """Drop a deleted post from the index"""
+        with self._lock:
+            self._discard(('post', post_id))
+
+    def remove_tag(self, tag_id):
+        """Drop a deleted tag from the index (call after commit)"""
+        with self._lock:
+            self._discard(('tag', tag_id))
+        # Tag deletes touch no posts, so announce this one ourselves
+        posts_generation.bump()
+
+    def suggest(self, query, limit=5):
+        """
+        Return (tags, posts) containing every word of query
+
+        Each list holds up to limit Suggestions, tags ranked by usage count
+        and posts by hot score.
+        """
+        words = tokenize(query)
+        if not words:
+            return [], []
+        if self.is_stale():
+            self.rebuild()
+
+        # Scan the run of the longest word, the most selective one
+        lead = max(words, key=len)
+        others = [word for word in words if word != lead]
+        matches = {'tag': set(), 'post': set()}
+        with self._lock:
+            index = bisect_left(self._tokens, (lead,))
+            while index < len(self._tokens) and self._tokens[index][0].startswith(lead):
+                _, kind, item_id = self._tokens[index]
+                matches[kind].add(item_id)
+                index += 1
+            results = []
+            for kind in ('tag', 'post'):
+                items = [self._items[(kind, item_id)] for item_id in matches[kind]]
+                if others:
+                    items = [item for item in items
+                             if all(any(word in token for token in item.tokens)
+                                    for word in others)]
+                results.append(heapq.nlargest(limit, items, key=lambda item: (item.score, item.id)))
+        return results[0], results[1]
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,134 @@
+from flask import current_app
+from sqlalchemy import delete, insert, literal, or_, select
+from sqlalchemy.orm import joinedload, selectinload
+from app import db
+from app.cache import bump_generations, get_generation, posts_generation
+from app.models import Post, TimelineEntry, User, follows
+from app.pagination import KeysetPagination
+
+
+def _fanout_limit():
+    return current_app.config.get('TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def _timeline_generation(user_id):
+    return f'timeline:{user_id}'
+
+
+def invalidate_timeline(user_id):
+    """Retire a user's cached timeline count after a follow or unfollow (call after commit)"""
+    bump_generations(_timeline_generation(user_id))
+
+
+def fans_out(author):
+    """Whether posts by author are copied into follower timelines on write"""
+    return (author.followers_count or 0) <= _fanout_limit()
+
+
+def fan_out_post(post):
+    """
+    Copy a newly published post into every follower's timeline
+    
+    One INSERT ... SELECT over the author's followers, in the caller's
+    transaction. Authors above TIMELINE_FANOUT_LIMIT followers are skipped;
+    their posts are merged in when a feed is read instead.
+    """
+    if post.is_draft or not fans_out(post.author):
+        return
+    db.session.flush()  # Assigns post.id
+    db.session.execute(insert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'author_id', 'created_at'],
+        select(follows.c.follower_id, literal(post.id), literal(post.author_id),
+               literal(post.created_at, type_=db.DateTime)).where(
+            follows.c.following_id == post.author_id
+        )
+    ))
+
+
+def remove_post_entries(post_id):
+    """Drop a deleted post from every timeline"""
+    db.session.execute(delete(TimelineEntry).where(TimelineEntry.post_id == post_id))
+
+
+def backfill_author(follower, author, limit=None):
+    """Add an author's recent posts to a new follower's timeline"""
+    if not fans_out(author):
+        return
+    limit = limit or current_app.config.get('TIMELINE_BACKFILL_SIZE', 50)
+    recent = select(Post.id, Post.author_id, Post.created_at).where(
+        Post.author_id == author.id,
+        Post.is_draft == False
+    ).order_by(Post.created_at.desc()).limit(limit).subquery()
+    db.session.execute(insert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'author_id', 'created_at'],
+        select(literal(follower.id), recent.c.id, recent.c.author_id, recent.c.created_at)
+    ))
+
+
+def remove_author(follower, author):
+    """Drop an unfollowed author's posts from the follower's timeline"""
+    db.session.execute(delete(TimelineEntry).where(
+        TimelineEntry.user_id == follower.id,
+        TimelineEntry.author_id == author.id
+    ))
+
+
+def rebuild_timelines():
+    """
+    Rebuild every timeline from the follow graph in one INSERT ... SELECT
+    
+    Fixes entries for authors who crossed TIMELINE_FANOUT_LIMIT in either
+    direction. Returns the number of entries written.
+    """
+    db.session.execute(delete(TimelineEntry))
+    rows = select(follows.c.follower_id, Post.id, Post.author_id, Post.created_at).join(
+        Post, Post.author_id == follows.c.following_id
+    ).join(User, User.id == Post.author_id).where(
+        Post.is_draft == False,
+        User.followers_count <= _fanout_limit()
+    )
+    result = db.session.execute(insert(TimelineEntry).from_select(
+        ['user_id', 'post_id', 'author_id', 'created_at'], rows
+    ))
+    db.session.commit()
+    # Every timeline may have changed; the posts generation is part of all their keys
+    posts_generation.bump()
+    return result.rowcount
+
+
+def timeline_pagination(user, cursor=None, page=1, per_page=20):
+    """
+    One page of posts by the authors user follows, newest first
+    
+    Normally a keyset range scan of the user's timeline_entries. When user
+    follows authors too popular to fan out, their posts are read from the
+    posts table and merged into the same order.
+    """
+    unfanned = db.session.query(User.id).join(
+        follows, follows.c.following_id == User.id
+    ).filter(
+        follows.c.follower_id == user.id,
+        User.followers_count > _fanout_limit()
+    ).all()
+    
+    if not unfanned:
+        query = Post.query.options(joinedload(Post.author), selectinload(Post.tags)).join(TimelineEntry, TimelineEntry.post_id == Post.id).filter(
+            TimelineEntry.user_id == user.id
+        )
+        order = (TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+    else:
+        fanned = select(TimelineEntry.post_id).where(TimelineEntry.user_id == user.id)
+        query = Post.query.options(joinedload(Post.author), selectinload(Post.tags)).filter(
+            Post.is_draft == False,
+            or_(Post.id.in_(fanned), Post.author_id.in_([row.id for row in unfanned]))
+        )
+        order = (Post.created_at.desc(), Post.id.desc())
+    
+    # Fan-out happens when posts are written, which bumps the posts generation;
+    # follows and unfollows bump the user's own timeline generation
+    count_key = ('timeline', user.id, posts_generation.value,
+                 get_generation(_timeline_generation(user.id)))
+    # Entries copy the post's created_at, so post values locate either order
+    return KeysetPagination(query, order, cursor=cursor, page=page, per_page=per_page,
+                            count_key=count_key,
+                            boundary=lambda post: [post.created_at, post.id])
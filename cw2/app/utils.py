@@ -1,5 +1,12 @@
+import heapq
+from collections import Counter
 from datetime import datetime, timedelta
-from app.models import Post, User, Tag
+from sqlalchemy import delete, func, insert, literal, select, union_all, update
+from app.models import Post, User, Tag, Comment, post_tags, post_likes, bookmarks, follows
+from app.cache import TTLCache, MISSING, bump_generations, get_generation
+from app.leaderboard import hot_posts_board
+from app.similarity import InteractionMatrix
+from app.replicas import use_primary
 from app import db
 from flask import url_for, abort
 from functools import wraps
@@ -42,6 +49,41 @@ def render_markdown(text):
     return html
 
 
+# Bump when rendering changes in a way the extension list does not capture
+MARKDOWN_RENDERER_REVISION = 1
+
+# Longest preview any page displays (search results)
+PREVIEW_STORED_LENGTH = 200
+
+
+def get_markdown_version():
+    """Fingerprint of the Markdown settings stored alongside rendered HTML"""
+    import hashlib
+    from flask import current_app
+    
+    extensions = current_app.config.get(
+        'MARKDOWN_EXTENSIONS',
+        ['codehilite', 'fenced_code', 'tables', 'nl2br']
+    )
+    settings = f'{MARKDOWN_RENDERER_REVISION}:{",".join(extensions)}'
+    return hashlib.sha1(settings.encode('utf-8')).hexdigest()
+
+
+def render_post_content(post):
+    """Store the rendered HTML and plain-text preview of a post's Markdown"""
+    post.content_html = render_markdown(post.content)
+    post.content_html_version = get_markdown_version()
+    # One character more than the longest preview shown, to detect truncation
+    post.preview = get_text_preview(post.content, PREVIEW_STORED_LENGTH + 1)[:PREVIEW_STORED_LENGTH + 1]
+
+
+def get_post_html(post):
+    """Get a post's HTML, rendering only if the stored copy is missing or outdated"""
+    if post.content_html is not None and post.content_html_version == get_markdown_version():
+        return post.content_html
+    return render_markdown(post.content)
+
+
 def get_text_preview(text, max_length=100):
     """
     Extract plain text preview from Markdown text
@@ -86,11 +128,27 @@ def get_text_preview(text, max_length=100):
     return text
 
 
-def get_avatar_url(user):
-    """Get user avatar URL"""
+def get_post_preview(post, max_length=100):
+    """Get a post's plain-text preview from the stored excerpt"""
+    if post.preview is None or max_length > PREVIEW_STORED_LENGTH:
+        # Not backfilled yet, or longer than what is stored
+        return get_text_preview(post.content, max_length)
+    if len(post.preview) > max_length:
+        return post.preview[:max_length] + '...'
+    return post.preview
+
+
+def get_avatar_url(user, size=128):
+    """Get the URL of the user's smallest avatar thumbnail at least size pixels wide"""
     from flask import url_for
-    if user.avatar_url and user.avatar_url != 'default_avatar.png':
-        return url_for('static', filename=f'images/uploads/{user.avatar_url}')
+    from app.avatars import AVATAR_DIR, DEFAULT_AVATAR, avatar_processor
+    avatar = user.avatar_url
+    if avatar and avatar.startswith(AVATAR_DIR + '/'):
+        stem, ext = avatar.rsplit('.', 1)
+        return url_for('static', filename=f'images/uploads/{stem}_{avatar_processor.pick_size(size)}.{ext}')
+    elif avatar and avatar != DEFAULT_AVATAR:
+        # Uploaded before thumbnails existed
+        return url_for('static', filename=f'images/uploads/{avatar}')
     else:
         return url_for('static', filename='images/default_avatar.png')
 
@@ -115,89 +173,186 @@ def time_ago(dt):
         return dt.strftime('%Y-%m-%d')
 
 
+class CommentNode:
+    """A comment with its precomputed depth and visible replies"""
+    __slots__ = ('comment', 'depth', 'children')
+    
+    def __init__(self, comment, depth=0):
+        self.comment = comment
+        self.depth = depth
+        self.children = []
+
+
+def build_comment_tree(comments):
+    """
+    Arrange a post's comments into threads in memory
+    
+    comments must already exclude deleted ones and be ordered oldest first.
+    Replies to hidden comments are dropped along with their parent.
+    Returns top-level nodes, newest first.
+    """
+    nodes = {}
+    roots = []
+    for comment in comments:
+        if comment.parent_id is None:
+            node = CommentNode(comment)
+            roots.append(node)
+        else:
+            parent = nodes.get(comment.parent_id)
+            if parent is None:
+                continue
+            node = CommentNode(comment, parent.depth + 1)
+            parent.children.append(node)
+        nodes[comment.id] = node
+    roots.reverse()
+    return roots
+
+
+def refresh_hot_scores(all_posts=False):
+    """
+    Recalculate stored hot scores so the time decay stays current
+    
+    Only posts young enough to still be decaying are touched unless
+    all_posts is True. Returns the number of posts updated.
+    """
+    # Scores are written back, so they must come from current counts
+    use_primary()
+    query = db.session.query(
+        Post.id, Post.created_at, Post.like_count,
+        Post.comment_count, Post.view_count
+    )
+    if not all_posts:
+        # One extra day so posts leaving the decay window get their final score
+        cutoff = datetime.utcnow() - timedelta(hours=168 + 24)
+        query = query.filter(Post.created_at >= cutoff)
+    
+    mappings = []
+    for row in query:
+        score = Post.hot_score_for(row.like_count, row.comment_count,
+                                   row.view_count, row.created_at)
+        mappings.append({'id': row.id, 'hot_score': score})
+    
+    if mappings:
+        db.session.bulk_update_mappings(Post, mappings)
+    db.session.commit()
+    hot_posts_board.invalidate()
+    return len(mappings)
+
+
 def get_hot_posts(limit=15):
     """获取热门帖子"""
-    posts = Post.query.filter_by(is_draft=False).all()
-    scored_posts = [(post, post.calculate_hot_score()) for post in posts]
-    scored_posts.sort(key=lambda x: x[1], reverse=True)
-    # 去重（按ID）
-    seen_ids = set()
-    unique_posts = []
-    for post, score in scored_posts:
-        if post.id not in seen_ids:
-            seen_ids.add(post.id)
-            unique_posts.append(post)
-        if len(unique_posts) >= limit:
-            break
-    return unique_posts
+    # Served from the in-memory leaderboard; only a TTL reload hits the database
+    return hot_posts_board.top(limit)
+
+
+# Per-user tag interest weights, keyed on a shared per-user generation so
+# activity handled by any worker retires the entries in all of them
+user_tags_cache = TTLCache(ttl=600, maxsize=10000)
+
+
+def _user_tags_generation(user_id):
+    return f'user_tags:{user_id}'
 
 
 def analyze_user_tags(user):
     """Analyze user's interest weights for tags"""
-    tag_weights = {}
-    
-    # Liked posts (weight 3)
-    for post in user.liked_posts:
-        for tag in post.tags:
-            tag_weights[tag.id] = tag_weights.get(tag.id, 0) + 3
-    
-    # Bookmarked posts (weight 2)
-    for post in user.bookmarked_posts:
-        for tag in post.tags:
-            tag_weights[tag.id] = tag_weights.get(tag.id, 0) + 2
-    
-    # Published posts (weight 1)
-    for post in user.posts:
-        for tag in post.tags:
-            tag_weights[tag.id] = tag_weights.get(tag.id, 0) + 1
+    key = (user.id, get_generation(_user_tags_generation(user.id)))
+    cached = user_tags_cache.get(key)
+    if cached is not MISSING:
+        return cached
+    
+    # Liked posts weigh 3, bookmarked posts 2, published posts 1
+    interactions = union_all(
+        select(post_likes.c.post_id.label('post_id'), literal(3).label('weight'))
+            .where(post_likes.c.user_id == user.id),
+        select(bookmarks.c.post_id, literal(2))
+            .where(bookmarks.c.user_id == user.id),
+        select(Post.id, literal(1))
+            .where(Post.author_id == user.id),
+    ).subquery()
+    
+    rows = db.session.execute(
+        select(post_tags.c.tag_id, func.sum(interactions.c.weight))
+        .join(interactions, interactions.c.post_id == post_tags.c.post_id)
+        .group_by(post_tags.c.tag_id)
+    ).all()
     
+    tag_weights = {tag_id: weight for tag_id, weight in rows}
+    user_tags_cache.set(key, tag_weights)
     return tag_weights
 
 
-def find_similar_users(user, limit=10):
-    """Find similar users"""
-    similar_users = {}
-    
-    # Based on follow relationships
-    for following in user.following:
-        for follower in following.followers:
-            if follower.id != user.id:
-                similar_users[follower.id] = similar_users.get(follower.id, 0) + 1
+def invalidate_user_tags(user):
+    """Retire cached tag weights after a like, bookmark or post change (call after commit)"""
+    bump_generations(_user_tags_generation(user.id))
+
+
+def _insert_ignoring_duplicates(table):
+    """INSERT that silently skips rows violating a unique key"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        return insert(table).prefix_with('IGNORE')  # MySQL / MariaDB
+    return dialect_insert(table).on_conflict_do_nothing()
+
+
+def toggle_user_row(table, user_id, target_column, target_table, target_id):
+    """
+    Flip a like/bookmark row of user_id on target_id without reading it first
     
-    # Based on liking same posts
-    user_liked_posts = {post.id for post in user.liked_posts}
-    for post in Post.query.all():
-        if post.id in user_liked_posts:
-            for liker in post.liked_by:
-                if liker.id != user.id:
-                    similar_users[liker.id] = similar_users.get(liker.id, 0) + 1
+    Tries INSERT ... SELECT ... ON CONFLICT DO NOTHING (the SELECT skips
+    missing targets), and DELETEs the row when nothing was inserted.
+    Returns +1 if the row was added, -1 if removed, and 0 if neither
+    (target missing, or a concurrent request removed the row first).
+    """
+    row = select(literal(user_id), target_table.c.id, literal(datetime.utcnow())).where(
+        target_table.c.id == target_id
+    )
+    stmt = _insert_ignoring_duplicates(table).from_select(
+        ['user_id', target_column.name, 'created_at'], row
+    )
+    if db.session.execute(stmt).rowcount:
+        return 1
+    
+    removed = db.session.execute(delete(table).where(
+        table.c.user_id == user_id,
+        target_column == target_id
+    )).rowcount
+    return -1 if removed else 0
+
+
+def add_to_counters(table, row_id, returning, **deltas):
+    """
+    UPDATE table SET col = col + delta ... WHERE id = row_id in one statement
     
-    # 排序并返回用户对象
-    sorted_users = sorted(similar_users.items(), key=lambda x: x[1], reverse=True)
-    user_ids = [uid for uid, score in sorted_users[:limit]]
-    return User.query.filter(User.id.in_(user_ids)).all()
+    Returns the row's returning columns after the update, or None if no
+    such row exists.
+    """
+    stmt = update(table).where(table.c.id == row_id).values(
+        {table.c[name]: table.c[name] + delta for name, delta in deltas.items()}
+    )
+    if db.engine.dialect.update_returning:
+        return db.session.execute(stmt.returning(*returning)).first()
+    if not db.session.execute(stmt).rowcount:
+        return None
+    return db.session.execute(select(*returning).where(table.c.id == row_id)).first()
 
 
-def calculate_recommendation_score(post, user, user_tags, similar_users):
+def calculate_recommendation_score(tag_weight, similar_count, hot_score, hours_old):
     """Calculate recommendation score"""
     # Tag matching (40%)
-    tag_score = 0
-    for tag in post.tags:
-        tag_score += user_tags.get(tag.id, 0)
-    tag_score = min(tag_score / 30, 1.0)  # Normalize
+    tag_score = min(tag_weight / 30, 1.0)  # Normalize
     
     # User similarity (30%)
-    similar_score = 0
-    for similar_user in similar_users:
-        if post in similar_user.liked_posts or post in similar_user.bookmarked_posts:
-            similar_score += 0.1
-    similar_score = min(similar_score, 1.0)
+    similar_score = min(similar_count * 0.1, 1.0)
     
     # Hotness score (20%)
-    hot_score = min(post.calculate_hot_score() / 100, 1.0)
+    hot_score = min(hot_score / 100, 1.0)
     
     # Time factor (10%)
-    hours_old = (datetime.utcnow() - post.created_at).total_seconds() / 3600
     time_score = max(0, 1 - hours_old / 168)  # Within a week
     
     # Combined score
@@ -209,6 +364,66 @@ def calculate_recommendation_score(post, user, user_tags, similar_users):
     return final_score
 
 
+def score_candidate_posts(user, limit=15, matrix=None):
+    """Score candidate posts for a user, returns [(post, score)] best first"""
+    # Analyze user interest tags
+    user_tags = analyze_user_tags(user)
+    
+    # Find similar users and count how many of them liked or bookmarked each post
+    if matrix is None:
+        matrix = InteractionMatrix.load_for_user(user.id)
+    similar_counts = Counter()
+    for similar_id, similarity in matrix.similar_users(user.id):
+        similar_counts.update(matrix.post_ids(similar_id))
+    
+    # Sum the user's tag weights per post in one pass over post_tags
+    tag_weights = Counter()
+    if user_tags:
+        rows = db.session.execute(
+            select(post_tags.c.post_id, post_tags.c.tag_id)
+            .where(post_tags.c.tag_id.in_(list(user_tags)))
+        )
+        for post_id, tag_id in rows:
+            tag_weights[post_id] += user_tags[tag_id]
+    
+    # Score candidate posts (exclude user's own posts) from their columns only
+    candidates = db.session.query(Post.id, Post.hot_score, Post.created_at).filter(
+        Post.author_id != user.id,
+        Post.is_draft == False
+    )
+    now = datetime.utcnow()
+    scored = [
+        (calculate_recommendation_score(
+            tag_weights[post_id], similar_counts[post_id], hot_score,
+            (now - created_at).total_seconds() / 3600
+        ), post_id)
+        for post_id, hot_score, created_at in candidates
+    ]
+    best = heapq.nlargest(limit, scored, key=lambda pair: (pair[0], -pair[1]))
+    
+    # Load full objects only for the winners
+    posts_by_id = {post.id: post for post in
+                   Post.query.filter(Post.id.in_([post_id for score, post_id in best]))}
+    return [(posts_by_id[post_id], score) for score, post_id in best if post_id in posts_by_id]
+
+
+def get_precomputed_recommendations(user, limit=15):
+    """
+    Get recommendations written by `flask recommend build`
+    
+    Returns None when nothing usable is stored for the user yet.
+    """
+    from app.models import UserRecommendation
+    
+    posts = Post.query.join(
+        UserRecommendation, UserRecommendation.post_id == Post.id
+    ).filter(
+        UserRecommendation.user_id == user.id,
+        Post.is_draft == False
+    ).order_by(UserRecommendation.rank).limit(limit).all()
+    return posts or None
+
+
 def get_recommended_posts(user=None, limit=15):
     """Get recommended posts"""
     from flask_login import current_user
@@ -219,28 +434,10 @@ def get_recommended_posts(user=None, limit=15):
     if not user or not hasattr(user, 'is_authenticated') or not user.is_authenticated:
         return get_hot_posts(limit)
     
-    # Analyze user interest tags
-    user_tags = analyze_user_tags(user)
-    
-    # Find similar users
-    similar_users = find_similar_users(user)
-    
-    # Get candidate posts (exclude user's own posts)
-    user_post_ids = [post.id for post in user.posts]
-    candidate_posts = Post.query.filter(
-        ~Post.id.in_(user_post_ids),
-        Post.is_draft == False
-    ).all()
-    
-    # Calculate recommendation scores
-    scored_posts = []
-    for post in candidate_posts:
-        score = calculate_recommendation_score(post, user, user_tags, similar_users)
-        scored_posts.append((post, score))
-    
-    # Sort and return
-    scored_posts.sort(key=lambda x: x[1], reverse=True)
-    recommended = [post for post, score in scored_posts[:limit]]
+    recommended = get_precomputed_recommendations(user, limit)
+    if recommended is None:
+        # Brand-new user without a batch result yet, score live
+        recommended = [post for post, score in score_candidate_posts(user, limit)]
     
     # If not enough recommendations, supplement with hot posts (exclude already recommended)
     if len(recommended) < limit:
@@ -261,6 +458,124 @@ def get_recommended_posts(user=None, limit=15):
     return unique_recommended[:limit]
 
 
+# Per-process state for `flask recommend build` workers
+_batch_matrix = None
+
+
+def _init_recommendation_worker(config):
+    """Give a pool worker its own app, database connection and matrix"""
+    global _batch_matrix
+    from app import create_app
+    
+    app = create_app(type('RecommendationWorkerConfig', (object,), config))
+    app.app_context().push()
+    _batch_matrix = InteractionMatrix.load()
+
+
+def _recommend_for_users(user_ids, limit):
+    """Score recommendations for a chunk of users inside a worker"""
+    results = []
+    for user in User.query.filter(User.id.in_(user_ids)):
+        scored = score_candidate_posts(user, limit, matrix=_batch_matrix)
+        results.append((user.id, [(post.id, score) for post, score in scored]))
+    db.session.remove()
+    return results
+
+
+def build_user_recommendations(limit=20, workers=1, chunk_size=50):
+    """
+    Precompute recommendations for every active user
+    
+    Users are split into chunks and scored across a process pool; the
+    results replace the user_recommendations table in one transaction.
+    Returns the number of users processed.
+    """
+    global _batch_matrix
+    from concurrent.futures import ProcessPoolExecutor
+    from functools import partial
+    from multiprocessing import get_context
+    from flask import current_app
+    from app.models import UserRecommendation
+    use_primary()
+    
+    user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.is_active == True)]
+    chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+    score_chunk = partial(_recommend_for_users, limit=limit)
+    
+    if workers > 1 and len(chunks) > 1:
+        config = {key: value for key, value in current_app.config.items() if key.isupper()}
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=get_context('spawn'),
+                                 initializer=_init_recommendation_worker,
+                                 initargs=(config,)) as pool:
+            chunk_results = list(pool.map(score_chunk, chunks))
+    else:
+        _batch_matrix = InteractionMatrix.load()
+        chunk_results = [score_chunk(chunk) for chunk in chunks]
+    
+    rows = []
+    for results in chunk_results:
+        for user_id, scored in results:
+            for rank, (post_id, score) in enumerate(scored):
+                rows.append({'user_id': user_id, 'post_id': post_id,
+                             'rank': rank, 'score': score})
+    
+    UserRecommendation.query.delete()
+    if rows:
+        db.session.bulk_insert_mappings(UserRecommendation, rows)
+    db.session.commit()
+    return len(user_ids)
+
+
+def release_post_counts(post):
+    """Take a post and its live comments off their authors' stats before deleting it"""
+    if not post.is_draft:
+        post.author.adjust_counts(posts_count=-1)
+    
+    # Comments go with the post through the cascade
+    rows = db.session.query(Comment.author_id, func.count(Comment.id)).filter(
+        Comment.post_id == post.id,
+        Comment.is_deleted == False
+    ).group_by(Comment.author_id)
+    for author_id, count in rows.all():
+        User.adjust_counts_for(author_id, comments_count=-count)
+
+
+def reconcile_user_counts():
+    """
+    Recompute every user's stats counters with one GROUP BY per counter
+    
+    Returns the number of users whose stored counters were wrong.
+    """
+    use_primary()
+    
+    def grouped(column, *filters):
+        return dict(db.session.query(column, func.count()).filter(*filters).group_by(column).all())
+    
+    posts = grouped(Post.author_id, Post.is_draft == False)
+    comments = grouped(Comment.author_id, Comment.is_deleted == False)
+    following = grouped(follows.c.follower_id)
+    followers = grouped(follows.c.following_id)
+    
+    mappings = []
+    rows = db.session.query(User.id, User.posts_count, User.comments_count,
+                            User.following_count, User.followers_count)
+    for row in rows:
+        counts = {
+            'posts_count': posts.get(row.id, 0),
+            'comments_count': comments.get(row.id, 0),
+            'following_count': following.get(row.id, 0),
+            'followers_count': followers.get(row.id, 0),
+        }
+        if any(getattr(row, name) != value for name, value in counts.items()):
+            mappings.append({'id': row.id, **counts})
+    
+    if mappings:
+        db.session.bulk_update_mappings(User, mappings)
+    db.session.commit()
+    return len(mappings)
+
+
 def admin_required(f):
     """Decorator to require admin privileges"""
     @wraps(f)
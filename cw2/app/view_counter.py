@@ -0,0 +1,126 @@
+import atexit
+import threading
+import time
+import weakref
+from flask import current_app
+from sqlalchemy import bindparam, update
+from app import db
+
+
+class ViewBuffer:
+    """Views of one app not written to its database yet"""
+
+    def __init__(self, app):
+        self.app = app
+        self.flush_size = app.config.get('VIEW_COUNT_FLUSH_SIZE', 100)
+        self.flush_interval = app.config.get('VIEW_COUNT_FLUSH_INTERVAL', 10)
+        self.lock = threading.Lock()
+        self.pending = {}  # post id -> views not yet written
+        self.pending_total = 0
+        self.flushed_at = time.monotonic()
+
+
+class ViewCounter:
+    """
+    Write-behind buffer for post view counts
+
+    Views are collected in memory per post ID and written in one batched
+    UPDATE when the buffer reaches VIEW_COUNT_FLUSH_SIZE views, every
+    VIEW_COUNT_FLUSH_INTERVAL seconds, and once more when the process
+    exits. Page views therefore no longer take the database write lock.
+
+    Each app keeps its own buffer in app.extensions['view_counter'].
+    Apps share a single timer thread and a single exit hook per process,
+    however many times create_app() runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._apps = weakref.WeakSet()
+        self._timer = None
+        self._atexit_registered = False
+
+    def init_app(self, app):
+        """Give the app a view buffer and make sure it gets flushed"""
+        if 'view_counter' in app.extensions:
+            return
+        buffer = app.extensions['view_counter'] = ViewBuffer(app)
+        with self._lock:
+            self._apps.add(app)
+            if not self._atexit_registered:
+                atexit.register(self.flush_all)
+                self._atexit_registered = True
+            if buffer.flush_interval and self._timer is None:
+                self._timer = threading.Thread(target=self._run_timer, name='view-counter', daemon=True)
+                self._timer.start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(1)
+            now = time.monotonic()
+            for app in list(self._apps):
+                buffer = app.extensions['view_counter']
+                if buffer.flush_interval and now - buffer.flushed_at >= buffer.flush_interval:
+                    self._flush_buffer(buffer)
+
+    def add(self, post_id, count=1):
+        """
+        Buffer views for a post
+
+        Returns the views for this post that a row loaded before the call
+        does not include yet, so callers can display an up to date count.
+        """
+        buffer = current_app.extensions['view_counter']
+        with buffer.lock:
+            pending = buffer.pending.get(post_id, 0) + count
+            buffer.pending[post_id] = pending
+            buffer.pending_total += count
+            full = buffer.pending_total >= buffer.flush_size
+        if full:
+            self.flush()
+        return pending
+
+    def flush(self):
+        """Write the current app's buffered views in one batched UPDATE"""
+        return self._write(current_app.extensions['view_counter'])
+
+    def flush_all(self):
+        """Write the buffered views of every app"""
+        for app in list(self._apps):
+            self._flush_buffer(app.extensions['view_counter'])
+
+    def _flush_buffer(self, buffer):
+        with buffer.app.app_context():
+            self._write(buffer)
+
+    def _write(self, buffer):
+        with buffer.lock:
+            pending, buffer.pending = buffer.pending, {}
+            buffer.pending_total = 0
+            buffer.flushed_at = time.monotonic()
+        if not pending:
+            return 0
+
+        from app.models import Post
+        posts = Post.__table__
+        # Views move the hot score with the same recency weight as the formula
+        stmt = update(posts).where(posts.c.id == bindparam('post_id')).values(
+            view_count=posts.c.view_count + bindparam('views'),
+            hot_score=posts.c.hot_score + Post.hot_score_gain(views=bindparam('views'))
+        )
+        params = [{'post_id': post_id, 'views': views} for post_id, views in pending.items()]
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(stmt, params)
+        except Exception:
+            # Keep the counts for the next attempt rather than losing them
+            with buffer.lock:
+                for post_id, views in pending.items():
+                    buffer.pending[post_id] = buffer.pending.get(post_id, 0) + views
+                    buffer.pending_total += views
+            buffer.app.logger.exception('Failed to flush buffered view counts')
+            return 0
+        return len(params)
+
+
+view_counter = ViewCounter()
@@ -0,0 +1,28 @@
+"""Add changed_at to cache_generations
+
+Revision ID: add_generation_changed_at
+Revises: trigram_posts_fts
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_generation_changed_at'
+down_revision = 'trigram_posts_fts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Record when each generation was last bumped, for Last-Modified headers
+    with op.batch_alter_table('cache_generations', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('changed_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    # Remove bump times
+    with op.batch_alter_table('cache_generations', schema=None) as batch_op:
+        batch_op.drop_column('changed_at')
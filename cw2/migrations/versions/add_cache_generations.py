@@ -0,0 +1,30 @@
+"""Add cache_generations table
+
+Revision ID: add_cache_generations
+Revises: add_timeline_entries
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_cache_generations'
+down_revision = 'add_timeline_entries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create shared cache version numbers, bumped by write paths in any worker
+    op.create_table('cache_generations',
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    # Drop shared cache version numbers
+    op.drop_table('cache_generations')
@@ -0,0 +1,30 @@
+"""Add rendered content_html to posts
+
+Revision ID: add_content_html
+Revises: add_user_recommendations
+Create Date: 2026-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_content_html'
+down_revision = 'add_user_recommendations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add rendered HTML columns; fill them with `flask posts render`
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_html', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('content_html_version', sa.String(length=40), nullable=True))
+
+
+def downgrade():
+    # Remove rendered HTML columns
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('content_html_version')
+        batch_op.drop_column('content_html')
@@ -0,0 +1,33 @@
+"""Add hot_score to posts
+
+Revision ID: add_hot_score
+Revises: add_is_admin
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_hot_score'
+down_revision = 'add_is_admin'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add indexed hot_score column to posts table
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('hot_score', sa.Float(), nullable=False, server_default='0'))
+        batch_op.create_index(batch_op.f('ix_posts_hot_score'), ['hot_score'], unique=False)
+    
+    # Backfill without the recency boost; `flask posts refresh-hot --all` applies it
+    op.execute('UPDATE posts SET hot_score = like_count * 2 + comment_count * 3 + view_count * 0.1')
+
+
+def downgrade():
+    # Remove hot_score column from posts table
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_posts_hot_score'))
+        batch_op.drop_column('hot_score')
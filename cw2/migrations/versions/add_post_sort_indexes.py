@@ -0,0 +1,30 @@
+"""Add indexes for keyset pagination on post counters
+
+Revision ID: add_post_sort_indexes
+Revises: add_posts_fts
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_post_sort_indexes'
+down_revision = 'add_posts_fts'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # (counter, id) indexes let list pages seek instead of sorting
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.create_index('ix_posts_like_count_id', ['like_count', 'id'], unique=False)
+        batch_op.create_index('ix_posts_comment_count_id', ['comment_count', 'id'], unique=False)
+        batch_op.create_index('ix_posts_view_count_id', ['view_count', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_index('ix_posts_view_count_id')
+        batch_op.drop_index('ix_posts_comment_count_id')
+        batch_op.drop_index('ix_posts_like_count_id')
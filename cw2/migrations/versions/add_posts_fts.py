@@ -0,0 +1,49 @@
+"""Add FTS5 full-text index for posts
+
+Revision ID: add_posts_fts
+Revises: add_preview
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_posts_fts'
+down_revision = 'add_preview'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # SQLite only; other backends keep using LIKE search
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    
+    op.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id'
+    )""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END""")
+    op.execute("""CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END""")
+    # Index existing posts
+    op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    
+    op.execute('DROP TRIGGER IF EXISTS posts_fts_update')
+    op.execute('DROP TRIGGER IF EXISTS posts_fts_delete')
+    op.execute('DROP TRIGGER IF EXISTS posts_fts_insert')
+    op.execute('DROP TABLE IF EXISTS posts_fts')
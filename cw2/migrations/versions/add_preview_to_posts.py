@@ -0,0 +1,28 @@
+"""Add plain-text preview to posts
+
+Revision ID: add_preview
+Revises: add_content_html
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_preview'
+down_revision = 'add_content_html'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add preview column; fill it with `flask posts render`
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('preview', sa.String(length=255), nullable=True))
+
+
+def downgrade():
+    # Remove preview column
+    with op.batch_alter_table('posts', schema=None) as batch_op:
+        batch_op.drop_column('preview')
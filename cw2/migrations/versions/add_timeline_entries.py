@@ -0,0 +1,40 @@
+"""Add timeline_entries table
+
+Revision ID: add_timeline_entries
+Revises: add_user_counters
+Create Date: 2026-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_timeline_entries'
+down_revision = 'add_user_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create fan-out table for following feeds; fill it with `flask timeline rebuild`
+    op.create_table('timeline_entries',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('author_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['author_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    with op.batch_alter_table('timeline_entries', schema=None) as batch_op:
+        batch_op.create_index('ix_timeline_entries_user_created', ['user_id', 'created_at', 'post_id'], unique=False)
+
+
+def downgrade():
+    # Drop following feed table
+    with op.batch_alter_table('timeline_entries', schema=None) as batch_op:
+        batch_op.drop_index('ix_timeline_entries_user_created')
+
+    op.drop_table('timeline_entries')
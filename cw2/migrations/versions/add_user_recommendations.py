@@ -0,0 +1,40 @@
+"""Add user_recommendations table
+
+Revision ID: add_user_recommendations
+Revises: add_hot_score
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_recommendations'
+down_revision = 'add_hot_score'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create table for precomputed recommendations
+    op.create_table('user_recommendations',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('score', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'post_id')
+    )
+    with op.batch_alter_table('user_recommendations', schema=None) as batch_op:
+        batch_op.create_index('ix_user_recommendations_user_rank', ['user_id', 'rank'], unique=False)
+
+
+def downgrade():
+    # Drop precomputed recommendations table
+    with op.batch_alter_table('user_recommendations', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_recommendations_user_rank')
+
+    op.drop_table('user_recommendations')
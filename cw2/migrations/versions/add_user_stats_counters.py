@@ -0,0 +1,43 @@
+"""Add denormalized stats counters to users
+
+Revision ID: add_user_counters
+Revises: add_post_sort_indexes
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_user_counters'
+down_revision = 'add_post_sort_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Add counter columns to users table
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('posts_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('comments_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('following_count', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('followers_count', sa.Integer(), nullable=False, server_default='0'))
+    
+    # Backfill; `flask users reconcile-counts` does the same later on
+    op.execute("""UPDATE users SET
+        posts_count = (SELECT COUNT(*) FROM posts
+                       WHERE posts.author_id = users.id AND posts.is_draft = false),
+        comments_count = (SELECT COUNT(*) FROM comments
+                          WHERE comments.author_id = users.id AND comments.is_deleted = false),
+        following_count = (SELECT COUNT(*) FROM follows WHERE follows.follower_id = users.id),
+        followers_count = (SELECT COUNT(*) FROM follows WHERE follows.following_id = users.id)""")
+
+
+def downgrade():
+    # Remove counter columns from users table
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('followers_count')
+        batch_op.drop_column('following_count')
+        batch_op.drop_column('comments_count')
+        batch_op.drop_column('posts_count')
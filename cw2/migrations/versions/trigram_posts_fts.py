@@ -0,0 +1,37 @@
+"""Switch the posts FTS5 index to the trigram tokenizer
+
+Revision ID: trigram_posts_fts
+Revises: add_cache_generations
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'trigram_posts_fts'
+down_revision = 'add_cache_generations'
+branch_labels = None
+depends_on = None
+
+
+def _recreate(tokenize):
+    # The sync triggers refer to posts_fts by name and keep working
+    op.execute('DROP TABLE IF EXISTS posts_fts')
+    op.execute(f"""CREATE VIRTUAL TABLE posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id'{tokenize}
+    )""")
+    op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def upgrade():
+    # Substring matching, so words inside unspaced CJK text are found
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate(", tokenize='trigram'")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    _recreate('')
@@ -1,8 +1,10 @@
 import os
 from app import create_app, db
+from app.config import Config, ProductionConfig
 from app.models import User, Post, Tag, Comment
 
-app = create_app()
+# FLASK_ENV=production selects the tuned SQLite settings
+app = create_app(ProductionConfig if os.environ.get('FLASK_ENV') == 'production' else Config)
 
 @app.shell_context_processor
 def make_shell_context():
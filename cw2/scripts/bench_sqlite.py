@@ -0,0 +1,124 @@
+"""
+Benchmark concurrent reads and writes under Config and ProductionConfig
+Usage: python scripts/bench_sqlite.py [--seconds 5] [--readers 8] [--writers 2]
+
+Each profile gets a fresh database file in a temporary directory, seeded
+with posts. Reader threads page through the post list while writer
+threads bump view counts, the same mix the forum sees. Throughput, p95
+latency and "database is locked" errors are reported for each profile.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Ensure we can import the app package from project root
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import create_app, db
+from app.config import Config, ProductionConfig
+from app.models import User, Post
+
+POST_COUNT = 2000
+
+READ_SQL = text('SELECT id, title, view_count FROM posts WHERE is_draft = 0 '
+                'ORDER BY created_at DESC, id DESC LIMIT 20 OFFSET :offset')
+WRITE_SQL = text('UPDATE posts SET view_count = view_count + 1 WHERE id = :id')
+
+
+def make_app(profile, path):
+    """Create an app for a config profile backed by a scratch database"""
+    class BenchConfig(profile):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        VIEW_COUNT_FLUSH_INTERVAL = 0  # No background flush thread
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        author = User(username='bench', email='bench@example.com')
+        author.set_password('bench')
+        db.session.add(author)
+        db.session.add_all(Post(title=f'Benchmark post {i}', content='Benchmark content', author=author)
+                           for i in range(POST_COUNT))
+        db.session.commit()
+    return app
+
+
+def run_workers(engine, seconds, readers, writers):
+    """Run reader and writer threads for a fixed time and collect their results"""
+    stop = time.monotonic() + seconds
+    results = {'read': [], 'write': [], 'errors': 0}
+    lock = threading.Lock()
+
+    def worker(kind):
+        latencies, errors = [], 0
+        while time.monotonic() < stop:
+            started = time.perf_counter()
+            try:
+                if kind == 'read':
+                    with engine.connect() as conn:
+                        conn.execute(READ_SQL, {'offset': random.randrange(0, POST_COUNT, 20)}).fetchall()
+                else:
+                    with engine.begin() as conn:
+                        conn.execute(WRITE_SQL, {'id': random.randint(1, POST_COUNT)})
+            except OperationalError:
+                errors += 1  # database is locked
+                continue
+            latencies.append(time.perf_counter() - started)
+        with lock:
+            results[kind].extend(latencies)
+            results['errors'] += errors
+
+    threads = ([threading.Thread(target=worker, args=('read',)) for _ in range(readers)] +
+               [threading.Thread(target=worker, args=('write',)) for _ in range(writers)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def p95(latencies):
+    """95th percentile latency in milliseconds"""
+    if not latencies:
+        return 0.0
+    return sorted(latencies)[int(len(latencies) * 0.95) - 1] * 1000
+
+
+def bench(seconds, readers, writers):
+    """Run the benchmark for each config profile and print a summary"""
+    print(f"\n{readers} readers, {writers} writers, {seconds}s per profile, {POST_COUNT} posts\n")
+    print(f"{'Profile':<18} {'Reads/s':>10} {'Writes/s':>10} {'Read p95 ms':>12} {'Write p95 ms':>13} {'Errors':>8}")
+    print("-" * 76)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for profile in (Config, ProductionConfig):
+            app = make_app(profile, Path(tmp) / f'{profile.__name__}.db')
+            with app.app_context():
+                results = run_workers(db.engine, seconds, readers, writers)
+                db.engine.dispose()
+            print(f"{profile.__name__:<18} "
+                  f"{len(results['read']) / seconds:>10.0f} "
+                  f"{len(results['write']) / seconds:>10.0f} "
+                  f"{p95(results['read']):>12.2f} "
+                  f"{p95(results['write']):>13.2f} "
+                  f"{results['errors']:>8}")
+    print()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='SQLite concurrency benchmark')
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    args = parser.parse_args()
+    bench(args.seconds, args.readers, args.writers)
@@ -55,15 +55,23 @@ def clear_data():
         db.session.execute(text("DELETE FROM follows"))
         print("已删除所有关注关系")
         
-        # 7. 删除帖子
+        # 7. 删除时间线条目（依赖用户和帖子）
+        db.session.execute(text("DELETE FROM timeline_entries"))
+        print("已删除所有时间线条目")
+        
+        # 8. 删除用户推荐（依赖用户和帖子）
+        db.session.execute(text("DELETE FROM user_recommendations"))
+        print("已删除所有用户推荐")
+        
+        # 9. 删除帖子
         Post.query.delete()
         print("已删除所有帖子")
         
-        # 8. 删除标签
+        # 10. 删除标签
         Tag.query.delete()
         print("已删除所有标签")
         
-        # 9. 删除用户
+        # 11. 删除用户
         User.query.delete()
         print("已删除所有用户")
         
@@ -31,10 +31,9 @@ def list_users():
         for user in users:
             admin_status = "Yes" if user.is_admin else "No"
             active_status = "Yes" if user.is_active else "No"
-            posts_count = user.posts.count()
-            comments_count = user.comments.filter_by(is_deleted=False).count()
             
-            print(f"{user.username:<20} {user.email:<30} {admin_status:<8} {active_status:<8} {posts_count:<8} {comments_count:<8}")
+            # Denormalized counters; `flask users reconcile-counts` recomputes them
+            print(f"{user.username:<20} {user.email:<30} {admin_status:<8} {active_status:<8} {user.posts_count:<8} {user.comments_count:<8}")
         
         print("\n")
 
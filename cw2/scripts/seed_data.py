@@ -15,6 +15,8 @@ if str(BASE_DIR) not in sys.path:
 
 from app import create_app, db
 from app.models import User, Post, Tag, Comment
+from app.utils import refresh_hot_scores, render_post_content, reconcile_user_counts
+from app.timeline import rebuild_timelines
 from sqlalchemy import text
 
 def seed_data(clear_existing=False):
@@ -121,6 +123,8 @@ def seed_data(clear_existing=False):
                 comment_count=random.randint(0, 50)
             )
             
+            render_post_content(post)
+            
             # Randomly assign tags (1-5)
             post_tags = random.sample(tags, random.randint(1, min(5, len(tags))))
             post.tags = post_tags
@@ -180,6 +184,18 @@ def seed_data(clear_existing=False):
         db.session.commit()
         print("Created like relationships")
         
+        # 8. Calculate stored hot scores
+        refresh_hot_scores(all_posts=True)
+        print("Calculated hot scores")
+        
+        # 9. Fill user stats counters
+        reconcile_user_counts()
+        print("Calculated user stats")
+        
+        # 10. Fill following timelines
+        rebuild_timelines()
+        print("Built following timelines")
+        
         print("\nData seeding completed!")
         print(f"Users: {User.query.count()}")
         print(f"Posts: {Post.query.count()}")
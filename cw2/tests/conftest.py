@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app, db
+from app.config import Config
+from app.models import Post, User
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App on a fresh SQLite database file, with an app context pushed"""
+    class TestConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "test.db"}'
+        SQLALCHEMY_BINDS = {'replica0': f'sqlite:///{tmp_path / "replica.db"}'}
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        VIEW_COUNT_FLUSH_INTERVAL = 0
+        AVATAR_WORKERS = 0
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def user(app):
+    user = User(username='alice', email='alice@example.com')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def make_posts(user):
+    """Create count published posts, newest first by created_at"""
+    def make(count):
+        now = datetime.utcnow()
+        posts = [Post(title=f'Post {i}', content=f'Content {i}', author=user,
+                      created_at=now - timedelta(minutes=i))
+                 for i in range(count)]
+        db.session.add_all(posts)
+        db.session.commit()
+        return posts
+    return make
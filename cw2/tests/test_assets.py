@@ -0,0 +1,59 @@
+import shutil
+
+import pytest
+from flask import url_for
+
+from app import create_app
+from app.assets import IMMUTABLE_MAX_AGE, assets
+from app.config import Config
+
+STATIC_DIRS = ['css', 'js', 'images']
+
+
+@pytest.fixture
+def built(app, tmp_path):
+    """Assets built into a copy of the static folder"""
+    static = tmp_path / 'static'
+    for name in STATIC_DIRS:
+        shutil.copytree(f'{app.static_folder}/{name}', static / name,
+                        ignore=shutil.ignore_patterns('uploads'))
+    app.static_folder = str(static)
+    return assets.build()
+
+
+@pytest.mark.parametrize('encoding', ['gzip', None])
+def test_built_files_are_cached_immutably(app, built, encoding):
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    response = app.test_client().get(f'/static/{built["css/site.css"]}', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    assert response.headers.get('Content-Encoding') == encoding
+    response.close()
+
+
+def test_source_files_are_revalidated(app, built):
+    response = app.test_client().get('/static/css/main.css')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers.get('Cache-Control', '')
+    response.close()
+
+
+def test_scripts_are_bundled_unchanged(app, built):
+    bundle = (app.static_folder + '/' + built['js/site.js'])
+    sources = [open(f'{app.static_folder}/js/{name}', encoding='utf-8').read()
+               for name in ('main.js', 'ajax.js', 'search.js')]
+    assert open(bundle, encoding='utf-8').read() == '\n'.join(sources)
+
+
+def test_apps_keep_their_own_manifest(app, built, tmp_path):
+    class OtherConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "other.db"}'
+    other = create_app(OtherConfig)  # Created last, without a build
+
+    response = app.test_client().get(f'/static/{built["css/site.css"]}')
+    assert 'immutable' in response.headers['Cache-Control']
+    response.close()
+    with app.test_request_context():
+        assert url_for('static', filename='css/site.css') == f'/static/{built["css/site.css"]}'
+    with other.test_request_context():
+        assert url_for('static', filename='css/site.css') == '/static/css/site.css'
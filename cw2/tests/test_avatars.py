@@ -0,0 +1,36 @@
+import io
+
+from PIL import Image
+
+from app import create_app, db
+from app.avatars import avatar_processor
+from app.config import Config
+
+
+def png():
+    buffer = io.BytesIO()
+    Image.new('RGB', (300, 200), (10, 200, 30)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def test_each_app_uses_its_own_settings(app, user, tmp_path):
+    app.config['UPLOAD_FOLDER'] = tmp_path / 'first'
+
+    class OtherConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "other.db"}'
+        UPLOAD_FOLDER = tmp_path / 'second'
+        AVATAR_SIZES = (32, 64)
+        AVATAR_WORKERS = 0
+    other = create_app(OtherConfig)  # Created last, as another app in the same process
+
+    assert avatar_processor.pick_size(100) == 128
+    with other.app_context():
+        assert avatar_processor.pick_size(100) == 64
+
+    with app.test_request_context():
+        assert avatar_processor.submit(user.id, png()) is None
+    db.session.refresh(user)
+    stem = user.avatar_url.rsplit('/', 1)[1].rsplit('.', 1)[0]
+    assert {path.name for path in (tmp_path / 'first' / 'avatars').iterdir()} == {
+        f'{stem}_{size}.jpg' for size in (48, 128, 256)}
+    assert not (tmp_path / 'second').exists()
@@ -0,0 +1,49 @@
+import pytest
+
+from app import db
+from app.leaderboard import HotPostLeaderboard
+from app.models import Post
+
+
+@pytest.fixture
+def hot(make_posts):
+    posts = make_posts(3)
+    for score, post in zip((30, 20, 10), posts):
+        post.hot_score = score
+    db.session.commit()
+    return posts
+
+
+def ids(board):
+    return [entry.id for entry in board.top(3)]
+
+
+def set_score(post, score):
+    post.hot_score = score
+    db.session.commit()
+
+
+def test_own_update_is_kept_without_reload(hot):
+    board = HotPostLeaderboard()
+    assert ids(board) == [post.id for post in hot]
+
+    set_score(hot[2], 40)
+    board.update(hot[2])
+    db.session.execute(db.update(Post).values(hot_score=0))  # Unannounced, so only a reload would see it
+    db.session.commit()
+    assert ids(board) == [hot[2].id, hot[0].id, hot[1].id]
+
+
+def test_update_in_another_worker_reloads_board(hot):
+    board, other_worker = HotPostLeaderboard(), HotPostLeaderboard()
+    ids(board)
+    ids(other_worker)
+
+    set_score(hot[2], 40)
+    other_worker.update(hot[2])
+    assert ids(board) == [hot[2].id, hot[0].id, hot[1].id]
+
+    db.session.delete(hot[0])
+    db.session.commit()
+    other_worker.remove(hot[0].id)
+    assert ids(board) == [hot[2].id, hot[1].id]
@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+from flask import template_rendered
+
+from app import page_cache as page_cache_module
+from app.page_cache import page_cache
+
+
+@pytest.fixture
+def anon(app, monkeypatch):
+    # Stay inside one TTL window, which is part of every page version
+    monkeypatch.setattr(page_cache_module, 'time', SimpleNamespace(time=lambda: 1_000_000_000.0))
+    page_cache.clear()
+    return app.test_client()
+
+
+@pytest.fixture
+def post(make_posts):
+    post, = make_posts(1)
+    return post
+
+
+@contextmanager
+def renders(app):
+    templates = []
+    def record(sender, template, context, **extra):
+        templates.append(template.name)
+    template_rendered.connect(record, app)
+    try:
+        yield templates
+    finally:
+        template_rendered.disconnect(record, app)
+
+
+def test_pages_carry_validators(anon, post):
+    first = anon.get(f'/post/{post.id}')
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/"')
+    assert first.last_modified is not None
+    assert anon.get(f'/post/{post.id}').headers['ETag'] == first.headers['ETag']
+
+
+@pytest.mark.parametrize('validator, header', [
+    ('ETag', 'If-None-Match'),
+    ('Last-Modified', 'If-Modified-Since'),
+])
+def test_revalidation_skips_render_in_every_worker(app, anon, post, validator, header):
+    first = anon.get(f'/post/{post.id}')
+    page_cache.clear()  # As in a worker that never rendered this page
+
+    with renders(app) as templates:
+        response = anon.get(f'/post/{post.id}', headers={header: first.headers[validator]})
+    assert response.status_code == 304
+    assert templates == []
+
+
+def test_invalidation_changes_validators(anon, post):
+    first = anon.get(f'/post/{post.id}')
+    page_cache.invalidate_post(post.id)
+
+    response = anon.get(f'/post/{post.id}', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
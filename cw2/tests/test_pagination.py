@@ -0,0 +1,123 @@
+import base64
+import json
+
+import pytest
+
+from app.models import Post
+from app.pagination import KeysetPagination
+
+ORDER = (Post.created_at.desc(), Post.id.desc())
+
+
+def paginate(**kwargs):
+    return KeysetPagination(Post.query, ORDER, per_page=20, **kwargs)
+
+
+def ids(pagination):
+    return [post.id for post in pagination.items]
+
+
+@pytest.fixture
+def posts(make_posts):
+    return make_posts(45)
+
+
+def test_first_page(posts):
+    pagination = paginate()
+    assert ids(pagination) == [post.id for post in posts[:20]]
+    assert pagination.page == 1
+    assert not pagination.has_prev and pagination.has_next
+    assert pagination.prev_cursor is None
+    assert pagination.total == 45 and pagination.pages == 3
+
+
+def test_next_cursors_walk_to_partial_last_page(posts):
+    pagination = paginate()
+    pagination = paginate(cursor=pagination.next_cursor)
+    assert pagination.page == 2
+    assert ids(pagination) == [post.id for post in posts[20:40]]
+
+    pagination = paginate(cursor=pagination.next_cursor)
+    assert pagination.page == 3
+    assert ids(pagination) == [post.id for post in posts[40:]]
+    assert pagination.has_prev and not pagination.has_next
+    assert pagination.next_cursor is None
+
+
+def test_prev_cursor_returns_previous_page(posts):
+    second = paginate(cursor=paginate().next_cursor)
+    third = paginate(cursor=second.next_cursor)
+    back = paginate(cursor=third.prev_cursor)
+    assert back.page == 2
+    assert ids(back) == ids(second)
+    assert back.has_prev and back.has_next
+
+    first = paginate(cursor=back.prev_cursor)
+    assert first.page == 1
+    assert ids(first) == [post.id for post in posts[:20]]
+    assert not first.has_prev
+
+
+def test_last_cursor_returns_only_the_remainder(posts):
+    last = paginate(cursor=paginate().last_cursor)
+    assert last.page == 3
+    assert ids(last) == [post.id for post in posts[40:]]
+    assert last.has_prev and not last.has_next
+
+    previous = paginate(cursor=last.prev_cursor)
+    assert previous.page == 2
+    assert ids(previous) == [post.id for post in posts[20:40]]
+
+
+def test_last_cursor_on_exact_multiple(make_posts):
+    posts = make_posts(40)
+    last = paginate(cursor=paginate().last_cursor)
+    assert last.page == 2
+    assert ids(last) == [post.id for post in posts[20:]]
+    assert not last.has_next
+
+
+def test_page_number_jump_uses_offset(posts):
+    pagination = paginate(page=3)
+    assert ids(pagination) == [post.id for post in posts[40:]]
+    assert pagination.has_prev and not pagination.has_next
+
+
+def test_single_partial_page(make_posts):
+    posts = make_posts(5)
+    pagination = paginate()
+    assert ids(pagination) == [post.id for post in posts]
+    assert not pagination.has_prev and not pagination.has_next
+    assert pagination.last_cursor is None
+    assert pagination.pages == 1
+
+
+def test_empty_query(app):
+    pagination = paginate()
+    assert pagination.items == []
+    assert not pagination.has_prev and not pagination.has_next
+    assert pagination.total == 0 and pagination.pages == 0
+    assert list(pagination.iter_pages()) == []
+
+
+def token(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', [
+    'garbage',
+    'eyJ2IjogWzFdfQ',
+    '',
+    token({'v': [None, None]}),
+    token({'v': [[1], [2]]}),
+    token({'v': [{'x': 1}, 2]}),
+    token({'v': [True, 2]}),
+    token({'v': [1, 2]}),
+    token({'v': [{'dt': '2026-01-01T00:00:00'}, 'x' * 3]}),
+    token({'v': [{'dt': '2026-01-01T00:00:00'}, 5, 6]}),
+    token({'v': 'abc'}),
+])
+def test_invalid_cursor_falls_back_to_first_page(posts, cursor):
+    pagination = paginate(cursor=cursor)
+    assert pagination.page == 1
+    assert ids(pagination) == [post.id for post in posts[:20]]
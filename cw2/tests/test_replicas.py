@@ -0,0 +1,111 @@
+import time
+
+import pytest
+from flask import session
+
+from app import db
+from app.cache import bump_generations, get_generation
+from app.models import User
+from app.replicas import use_primary, use_replica
+
+
+@pytest.fixture
+def replica(app, user):
+    """Replica with the schema but none of the primary's rows"""
+    engine = db.engines['replica0']
+    db.metadata.create_all(engine)
+    db.session.remove()  # Start from a fresh session, as each request does
+    return engine
+
+
+def count_users():
+    return User.query.count()
+
+
+def test_reads_use_primary_by_default(replica):
+    assert count_users() == 1
+
+
+def test_replica_routed_get_reads_from_replica(app, replica):
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(count_users)() == 0
+
+
+def test_replica_routing_ignores_post_requests(app, replica):
+    with app.test_request_context('/', method='POST'):
+        assert use_replica(count_users)() == 1
+
+
+def test_reads_after_a_write_use_primary(app, replica):
+    def view():
+        bob = User(username='bob', email='bob@example.com')
+        bob.set_password('password123')
+        db.session.add(bob)
+        db.session.flush()
+        return count_users()
+
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(view)() == 2
+
+
+def test_dml_statement_pins_session_to_primary(app, replica):
+    def view():
+        db.session.execute(db.update(User).values(bio='hi'))
+        return count_users()
+
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(view)() == 1
+
+
+def test_use_primary_pins_reads(app, replica):
+    def view():
+        use_primary()
+        return count_users()
+
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(view)() == 1
+
+
+def test_session_sticks_to_one_replica(app, replica):
+    def view():
+        count_users()
+        return db.session.info['replica_key']
+
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(view)() == 'replica0'
+
+
+def test_user_loader_reads_primary(app, replica):
+    user_id = User.query.filter_by(username='alice').one().id
+    db.session.remove()
+
+    def view():
+        return app.login_manager._user_callback(str(user_id))
+
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(view)().username == 'alice'
+
+
+def test_generation_read_from_same_database_as_data(app, replica):
+    bump_generations('posts')
+    assert get_generation('posts') == 1
+    db.session.remove()
+
+    with app.test_request_context('/', method='GET'):
+        assert use_replica(lambda: get_generation('posts'))() == 0
+
+
+def test_commit_keeps_visitor_on_primary(app, replica):
+    def view():
+        db.session.execute(db.update(User).values(bio='hi'))
+        db.session.commit()
+
+    with app.test_request_context('/', method='POST'):
+        view()
+        assert session['primary_until'] > time.time()
+
+
+def test_recent_writer_reads_primary(app, replica):
+    with app.test_request_context('/', method='GET'):
+        session['primary_until'] = time.time() + 10
+        assert use_replica(count_users)() == 1
@@ -0,0 +1,67 @@
+import pytest
+
+from app import db
+from app.cache import posts_generation
+from app.models import Post, Tag
+from app.suggest import SuggestionIndex
+
+
+@pytest.fixture
+def index(user):
+    db.session.add_all([
+        Post(title='Badminton footwork drills', content='-', author=user, hot_score=5),
+        Post(title='羽毛球技术入门', content='-', author=user, hot_score=3),
+        Post(title='Hidden draft', content='-', author=user, is_draft=True),
+        Tag(name='smash', usage_count=4),
+    ])
+    db.session.commit()
+    return SuggestionIndex()
+
+
+def titles(index, query):
+    tags, posts = index.suggest(query)
+    return [item.text for item in tags + posts]
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('badm', ['Badminton footwork drills']),
+    ('minton', ['Badminton footwork drills']),
+    ('技术', ['羽毛球技术入门']),
+    ('drills foot', ['Badminton footwork drills']),
+    ('mash', ['smash']),
+    ('draft', []),
+    ('minton smash', []),
+])
+def test_matches_words_anywhere(index, query, expected):
+    assert titles(index, query) == expected
+
+
+def test_updates_replace_old_words(index):
+    post = Post.query.filter_by(title='羽毛球技术入门').one()
+    index.suggest('技术')  # Load the index
+    post.title = 'Net play basics'
+    index.update_post(post)
+    assert titles(index, '技术') == []
+    assert titles(index, 'play') == ['Net play basics']
+
+    index.remove_post(post.id)
+    assert titles(index, 'play') == []
+
+
+def test_post_write_in_another_worker_reloads_index(index):
+    index.suggest('badm')  # Load the index
+    post = Post.query.filter_by(title='Badminton footwork drills').one()
+    post.title = 'Net play basics'
+    db.session.commit()
+    posts_generation.bump()  # As the route that saved it does after commit
+    assert titles(index, 'badm') == []
+    assert titles(index, 'play') == ['Net play basics']
+
+
+def test_tag_removed_in_another_worker(index):
+    index.suggest('mash')
+    tag = Tag.query.filter_by(name='smash').one()
+    db.session.delete(tag)
+    db.session.commit()
+    SuggestionIndex().remove_tag(tag.id)
+    assert titles(index, 'mash') == []
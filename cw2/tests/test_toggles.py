@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Post, bookmarks, post_likes
+from app.utils import _insert_ignoring_duplicates, add_to_counters, toggle_user_row
+
+posts = Post.__table__
+
+
+def like_rows(user, post):
+    return db.session.query(post_likes).filter_by(user_id=user.id, post_id=post.id).count()
+
+
+def toggle_like(user, post_id):
+    return toggle_user_row(post_likes, user.id, post_likes.c.post_id, posts, post_id)
+
+
+def test_toggle_adds_then_removes_row(user, make_posts):
+    post, = make_posts(1)
+    assert toggle_like(user, post.id) == 1
+    assert like_rows(user, post) == 1
+    assert toggle_like(user, post.id) == -1
+    assert like_rows(user, post) == 0
+    assert toggle_like(user, post.id) == 1
+
+
+def test_toggle_missing_target_does_nothing(user):
+    assert toggle_like(user, 9999) == 0
+    assert db.session.query(post_likes).count() == 0
+
+
+def test_toggles_are_per_table(user, make_posts):
+    post, = make_posts(1)
+    assert toggle_like(user, post.id) == 1
+    assert toggle_user_row(bookmarks, user.id, bookmarks.c.post_id, posts, post.id) == 1
+    assert like_rows(user, post) == 1
+
+
+def test_insert_ignoring_duplicates_skips_existing_row(user, make_posts):
+    post, = make_posts(1)
+    row = {'user_id': user.id, 'post_id': post.id}
+    assert db.session.execute(_insert_ignoring_duplicates(post_likes).values(**row)).rowcount == 1
+    assert db.session.execute(_insert_ignoring_duplicates(post_likes).values(**row)).rowcount == 0
+    assert like_rows(user, post) == 1
+
+
+def test_add_to_counters_returns_updated_row(make_posts):
+    post, = make_posts(1)
+    row = add_to_counters(posts, post.id, (posts.c.id, posts.c.like_count), like_count=1)
+    assert row.id == post.id and row.like_count == 1
+    row = add_to_counters(posts, post.id, (posts.c.like_count,), like_count=-1)
+    assert row.like_count == 0
+
+
+def test_add_to_counters_missing_row(app):
+    assert add_to_counters(posts, 9999, (posts.c.like_count,), like_count=1) is None
+
+
+def test_like_gain_matches_hot_score_formula(user):
+    post = Post(title='Post', content='-', author=user,
+                created_at=datetime.utcnow() - timedelta(hours=30))
+    db.session.add(post)
+    db.session.commit()
+
+    row = add_to_counters(posts, post.id, (posts.c.like_count, posts.c.hot_score),
+                          like_count=1, hot_score=Post.hot_score_gain(likes=1))
+    assert row.like_count == 1
+    assert row.hot_score == pytest.approx(Post.hot_score_for(1, 0, 0, post.created_at), abs=1e-3)
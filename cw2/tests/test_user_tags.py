@@ -0,0 +1,42 @@
+import pytest
+
+from app import db
+from app.cache import bump_generations
+from app.models import Post, Tag, post_likes
+from app.utils import analyze_user_tags, invalidate_user_tags, user_tags_cache
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(app):
+    user_tags_cache.clear()  # Each test's database starts its generations from 0
+
+
+def tagged_post(user, name):
+    post = Post(title=name, content='-', author=user, tags=[Tag(name=name)])
+    db.session.add(post)
+    db.session.commit()
+    return post
+
+
+def test_weights_are_cached_until_invalidated(user):
+    own = tagged_post(user, 'footwork')
+    assert analyze_user_tags(user) == {own.tags[0].id: 1}
+
+    liked = tagged_post(user, 'smash')
+    db.session.execute(post_likes.insert().values(user_id=user.id, post_id=liked.id))
+    db.session.commit()
+    assert analyze_user_tags(user) == {own.tags[0].id: 1}  # Still the cached weights
+
+    invalidate_user_tags(user)
+    assert analyze_user_tags(user) == {own.tags[0].id: 1, liked.tags[0].id: 4}
+
+
+def test_bump_from_another_worker_retires_cached_weights(user):
+    post = tagged_post(user, 'footwork')
+    analyze_user_tags(user)
+    db.session.execute(post_likes.insert().values(user_id=user.id, post_id=post.id))
+    db.session.commit()
+
+    # Another worker's invalidate_user_tags only reaches this one through the shared row
+    bump_generations(f'user_tags:{user.id}')
+    assert analyze_user_tags(user) == {post.tags[0].id: 4}
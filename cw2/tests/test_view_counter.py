@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from app.models import Post
+from app.view_counter import view_counter
+
+
+@pytest.mark.parametrize('age', [timedelta(hours=1), timedelta(days=3), timedelta(days=30)])
+def test_flush_scores_views_like_the_formula(user, age):
+    post = Post(title='Post', content='-', author=user, created_at=datetime.utcnow() - age)
+    db.session.add(post)
+    db.session.commit()
+    post_id = post.id
+
+    for _ in range(7):
+        view_counter.add(post_id)
+    assert view_counter.flush() == 1
+
+    db.session.expire_all()
+    post = db.session.get(Post, post_id)
+    assert post.view_count == 7
+    assert post.hot_score == pytest.approx(post.calculate_hot_score(), abs=1e-3)